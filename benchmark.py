@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+import changelog_generator
+import config_loader
+from json_generator import JSONSchemaGenerator
+
+types = ['str', 'int', 'float', 'bool']
+defaults = {'str': '"value"', 'int': '10', 'float': '0.5', 'bool': 'False'}
+
+
+def get_class_name(module):
+    return ''.join(word.capitalize() for word in module.split('_'))
+
+
+def get_property_row(name, prop_type, enum_size, indent):
+    row = f"{' ' * indent}* **{name}** (*{prop_type}*) - ({defaults[prop_type]}) Description of the {name} property with some `Reference <https://biobb.readthedocs.io/>`_ text."
+    if enum_size and prop_type == 'str':
+        row += " Values: " + ", ".join(f"value{i} (description of value {i})" for i in range(enum_size)) + "."
+    return row
+
+
+def get_module_source(module, properties, nested, parameters, enum_size):
+    rows = [
+        '    """',
+        f'    | biobb_synthetic {get_class_name(module)}',
+        f'    | Synthetic building block {module}.',
+        '',
+        '    Args:',
+        '        input_file_path (str): Path to the input file. File type: input. `Sample file <https://github.com/bioexcel/biobb_synthetic/raw/master/biobb_synthetic/test/data/input.pdb>`_. Accepted formats: pdb (edam:format_1476), gro (edam:format_2033).',
+        '        input_top_path (str) (Optional): Path to the input topology. File type: input. Accepted formats: top (edam:format_3880).',
+        '        output_file_path (str): Path to the output file. File type: output. `Sample file <https://github.com/bioexcel/biobb_synthetic/raw/master/biobb_synthetic/test/reference/output.pdb>`_. Accepted formats: pdb (edam:format_1476).',
+        '        properties (dic - Python dictionary object containing the tool parameters, not input/output files):',
+    ]
+    for i in range(properties):
+        rows.append(get_property_row(f'property{i}', types[i % len(types)], enum_size, 12))
+    for i in range(nested):
+        rows.append(f"            * **dictionary{i}** (*dict*) - (None) Dictionary {i} of parameters.")
+        for j in range(parameters):
+            rows.append(get_property_row(f'parameter{j}', types[j % len(types)], enum_size, 16))
+    rows.append('    """')
+    doc = '\n'.join(rows)
+    return f'''#!/usr/bin/env python3
+
+"""Module containing the {get_class_name(module)} class and the command line interface."""
+import argparse
+from pathlib import Path
+
+
+class {get_class_name(module)}():
+{doc}
+
+    def __init__(self, input_file_path, output_file_path, input_top_path=None, properties=None, **kwargs):
+        self.properties = properties or {{}}
+
+
+def {module}(input_file_path, output_file_path, input_top_path=None, properties=None, **kwargs):
+    return {get_class_name(module)}(input_file_path=input_file_path, output_file_path=output_file_path,
+                                    input_top_path=input_top_path, properties=properties).launch()
+'''
+
+
+def generate_package(root, package, blocks, modules, properties, nested=1, parameters=5, enum_size=3):
+    """ creates a synthetic biobb package in root/package/package, returns the path to the inner folder """
+    package_path = Path(root).joinpath(package, package)
+    package_path.joinpath('json_schemas').mkdir(parents=True, exist_ok=True)
+    package_path.joinpath('test', 'data', 'config').mkdir(parents=True, exist_ok=True)
+
+    block_names = [f'block{b}' for b in range(blocks)]
+    package_path.joinpath('__init__.py').write_text(f'name = "{package}"\n__all__ = {block_names!r}\n')
+
+    conf = ['global_properties:\n  working_dir_path: /tmp/biobb_synthetic\n']
+    for block in block_names:
+        module_names = [f'{block}_module{m}' for m in range(modules)]
+        package_path.joinpath(block).mkdir(exist_ok=True)
+        package_path.joinpath(block, '__init__.py').write_text(f'name = "{block}"\n__all__ = {module_names!r}\n')
+        for module in module_names:
+            package_path.joinpath(block, module + '.py').write_text(get_module_source(module, properties, nested, parameters, enum_size))
+            conf.append(f'{module}:\n  paths:\n    input_file_path: file:test_data_dir/{block}/input.pdb\n    output_file_path: output.pdb\n'
+                        f'  properties:\n    property0: value0\n    property1: 1\n    property2: 0.5\n')
+    package_path.joinpath('test', 'conf.yml').write_text(''.join(conf))
+
+    return package_path
+
+
+def generate_git_log(commits, commits_per_tag=50):
+    """ returns a synthetic git log output, newest commit first, with the fields and separators of changelog_generator.get_git_log """
+    commit_types = ['feat', 'fix', 'docs', 'refactor', 'perf', 'test']
+    records = []
+    for i in range(commits):
+        if i % commits_per_tag == 0:
+            version = commits // commits_per_tag - i // commits_per_tag + 300
+            refs, subject, body = f'tag: v{version // 100}.{version % 100 // 10}.{version % 10}', f'Release {version}', 'Version overview'
+        else:
+            commit_type = commit_types[i % len(commit_types)]
+            breaking = '!' if i % 97 == 0 else ''
+            refs = ''
+            subject = f'{commit_type}(block{i % 13}){breaking}: synthetic change number {i}'
+            body = f'Body of the change {i}.\nSecond line.\n\nissue: https://github.com/bioexcel/biobb_synthetic/issues/{i % 500}'
+            if i % 7 == 0:
+                body += f', https://github.com/bioexcel/biobb_synthetic/issues/{i % 300}'
+        values = [f'{i:040x}', f'{i:07x}', f'{i + 1:040x}', refs, 'Author', 'author@example.com', 'Mon, 1 Jan 2024 00:00:00 +0000',
+                  'Commiter', 'commiter@example.com', 'Mon, 1 Jan 2024 00:00:00 +0000', subject, body]
+        records.append('\x1f'.join(values))
+    return records
+
+
+def unload(package):
+    """ removes the package modules from sys.modules so they are imported again """
+    for name in [name for name in sys.modules if name == package or name.startswith(package + '.')]:
+        del sys.modules[name]
+
+
+def measure(function, repeat):
+    """ returns best time of repeat executions and peak memory of an extra execution """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, min(times), peak
+
+
+def print_row(stage, seconds, modules, lines, peak):
+    lines_sec = f"{lines / seconds:>14.0f}" if lines else f"{'-':>14}"
+    print(f"{stage:<24}{seconds * 1000:>12.2f}{modules / seconds:>14.1f}{lines_sec}{peak / 1024 / 1024:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the docstring to JSON schema pipeline with a synthetic biobb package.",
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
+                                     epilog="Examples: \nbenchmark.py\nbenchmark.py -b 10 -m 20 -p 40 -n 2 -r 8 -e 10 -c 10000")
+    parser.add_argument('--blocks', '-b', required=False, default=5, type=int, help='Number of blocks of the package. Default: 5.')
+    parser.add_argument('--modules', '-m', required=False, default=10, type=int, help='Number of modules per block. Default: 10.')
+    parser.add_argument('--properties', '-p', required=False, default=20, type=int, help='Number of properties per module. Default: 20.')
+    parser.add_argument('--nested', '-n', required=False, default=1, type=int, help='Number of dictionary properties with nested parameters per module. Default: 1.')
+    parser.add_argument('--parameters', '-r', required=False, default=5, type=int, help='Number of parameters per dictionary property. Default: 5.')
+    parser.add_argument('--enum_size', '-e', required=False, default=3, type=int, help='Number of values of the str properties. Default: 3.')
+    parser.add_argument('--repeat', '-t', required=False, default=3, type=int, help='Number of timed executions of every stage, the best one is reported. Default: 3.')
+    parser.add_argument('--commits', '-c', required=False, default=100000, type=int, help='Number of commits of the synthetic git history of the changelog stages. Default: 100000.')
+    parser.add_argument('--output', '-o', required=False, default=None, type=str, help='Folder where the synthetic package is kept. Default: temporary folder.')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.output or tmp_dir
+        package = 'biobb_synthetic'
+        package_path = generate_package(root, package, args.blocks, args.modules, args.properties, args.nested, args.parameters, args.enum_size)
+        sys.path.insert(0, str(package_path.parent))
+
+        generator = JSONSchemaGenerator(input_package=package, output_path=str(package_path))
+        tasks = [(block, module) for block in generator.getStaticAll(package_path.joinpath('__init__.py'))
+                 for module in generator.getStaticAll(package_path.joinpath(block, '__init__.py'))]
+        n_modules = len(tasks)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            docs, static_time, static_peak = measure(lambda: [generator.getStaticDoc(block, module)[1] for block, module in tasks], args.repeat)
+            def import_docs():
+                unload(package)
+                return [generator.getImportDoc(block, module)[1] for block, module in tasks]
+            _, import_time, import_peak = measure(import_docs, args.repeat)
+            doclines = [doc.splitlines() for doc in docs]
+            n_lines = sum(len(lines) for lines in doclines)
+
+            schemas, parse_time, parse_peak = measure(lambda: [generator.parseDocs(lines, module) for lines, (_, module) in zip(doclines, tasks)], args.repeat)
+
+            def save():
+                # files are removed so all of them are written, unchanged files are skipped by the writer
+                generator.cleanOutputPath()
+                generator.writer.commit()
+                for (_, module), schema in zip(tasks, schemas):
+                    generator.saveJSONFile(module, schema)
+                    generator.saveConfigJSONFile({'property0': 'value0'}, module)
+                generator.writer.commit()
+            _, save_time, save_peak = measure(save, args.repeat)
+
+            conf_path = package_path.joinpath('test', 'conf.yml')
+            conf_lines = len(conf_path.read_text().splitlines())
+
+            def load_conf(loader):
+                config_loader.loaded_configs.clear()
+                return config_loader.load_config(conf_path, loader)
+            _, python_yaml_time, python_yaml_peak = measure(lambda: load_conf(yaml.SafeLoader), args.repeat)
+            _, yaml_time, yaml_peak = measure(lambda: load_conf(config_loader.SafeLoader), args.repeat)
+
+            _, launch_time, launch_peak = measure(lambda: JSONSchemaGenerator(input_package=package, output_path=str(package_path), static=True).launch(), args.repeat)
+
+        print(f"Synthetic package: {n_modules} modules, {n_lines} docstring lines")
+        print(f"{'stage':<24}{'time (ms)':>12}{'modules/s':>14}{'lines/s':>14}{'peak (MB)':>12}")
+        print_row('class lookup (static)', static_time, n_modules, n_lines, static_peak)
+        print_row('class lookup (import)', import_time, n_modules, 0, import_peak)
+        print_row('parseDocs', parse_time, n_modules, n_lines, parse_peak)
+        print_row('JSON writing', save_time, n_modules, 0, save_peak)
+        print_row('conf.yml SafeLoader', python_yaml_time, n_modules, conf_lines, python_yaml_peak)
+        print_row(f'conf.yml {config_loader.SafeLoader.__name__}', yaml_time, n_modules, conf_lines, yaml_peak)
+        print_row('launch (static)', launch_time, n_modules, n_lines, launch_peak)
+
+    git_log = generate_git_log(args.commits)
+    commits, parse_log_time, parse_log_peak = measure(lambda: [changelog_generator.parse_git_log_record(record) for record in git_log], args.repeat)
+    tag_list, classify_time, classify_peak = measure(lambda: changelog_generator.get_tag_list(commits, 0), args.repeat)
+    _, render_time, render_peak = measure(lambda: changelog_generator.get_md_str_versions(tag_list, 'https://github.com/bioexcel/biobb_synthetic'), args.repeat)
+
+    print()
+    print(f"Synthetic git history: {args.commits} commits, {len(tag_list)} versions")
+    print(f"{'stage':<24}{'time (ms)':>12}{'commits/s':>14}{'peak (MB)':>12}")
+    for stage, seconds, peak in [('git log parsing', parse_log_time, parse_log_peak),
+                                 ('commit classification', classify_time, classify_peak),
+                                 ('changelog rendering', render_time, render_peak)]:
+        print(f"{stage:<24}{seconds * 1000:>12.2f}{args.commits / seconds:>14.0f}{peak / 1024 / 1024:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,9 @@ git commit -m "type(scope): subject Short description everything in the same lin
 Notes:
 * subject and body are separated by a blank line.
 * body and issue are separated by a blank line.
-* scope: Anything the class, module name or general topic.
+* scope: Anything the class, module name or general topic. The scope is optional.
+* breaking changes: An exclamation mark right before the colon, ie `feat(scope)!: subject`, or a `BREAKING CHANGE:` line in the body.
+* issues: Several issues can be referenced in the same line, ie `issues: url1, url2`, or in consecutive lines.
 * type:
     * **build**: Changes that affect the build system or external dependencies.
     * **ci**: Changes to our CI configuration files and scripts.
@@ -20,6 +22,7 @@ Notes:
     * **refactor**: A code change that neither fixes a bug nor adds a feature.
     * **style**: Changes that do not affect the meaning of the code (white-space, formatting, etc).
     * **test**: Adding missing tests or correcting existing tests.
+* accepted types: any word of letters in any case is accepted as type (ie `chore`, `revert` or `Feat`), feat and fix commits go to their own sections and the rest to other changes.
 
 Git tag for new version example:
 ```
@@ -28,106 +31,269 @@ git tag -a $version -m "version_number \n\n Change log file overview"
 """
 
 import argparse
+import contextlib
 import json
+from collections import namedtuple
 from pathlib import Path
 import re
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import stage, count, add_profile_argument, profile
 
+# git log fields separated by the unit separator character, the body must be the last one because it is free text
+GIT_LOG_FIELDS = [('commit', '%H'), ('abbreviated_commit', '%h'), ('parent', '%P'), ('refs', '%D'),
+                  ('author_name', '%aN'), ('author_email', '%aE'), ('author_date', '%aD'),
+                  ('commiter_name', '%cN'), ('commiter_email', '%cE'), ('commiter_date', '%cD'),
+                  ('subject', '%s'), ('body', '%b')]
 
-def get_git_log(repo_dir):
-    git_log_format = '\'{%n  "commit": "%H",%n  "abbreviated_commit": "%h",%n  "tree": "%T",%n  "abbreviated_tree": "%t",%n  "parent": "%P",%n  "abbreviated_parent": "%p",%n  "refs": "%D",%n  "encoding": "%e",%n  "subject": "%s",%n  "sanitized_subject_line": "%f",%n  "body": "%b",%n  "commit_notes": "%N",%n  "verification_flag": "%G?",%n  "signer": "%GS",%n  "signer_key": "%GK",%n  "author": {%n    "name": "%aN",%n    "email": "%aE",%n    "date": "%aD"%n  },%n  "commiter": {%n    "name": "%cN",%n    "email": "%cE",%n    "date": "%cD"%n  }%n},\''
-    raw_json_log = subprocess.getoutput(f'cd {repo_dir} && git log --pretty=format:{git_log_format}')
-    return json.loads(raw_json_log)
+
+def parse_git_log_record(record):
+    values = record.split('\x1f', len(GIT_LOG_FIELDS) - 1)
+    commit = dict(zip([field for field, _ in GIT_LOG_FIELDS], values))
+    commit['author'] = {'name': commit.pop('author_name'), 'email': commit.pop('author_email'), 'date': commit.pop('author_date')}
+    commit['commiter'] = {'name': commit.pop('commiter_name'), 'email': commit.pop('commiter_email'), 'date': commit.pop('commiter_date')}
+    return commit
+
+
+def get_git_log(repo_dir, revision_range=None):
+    """ yields the commits of the repository, newest first, reading git log output as it is produced.
+    The git process is killed if the generator is closed before the end of the history, otherwise its exit status is checked
+    once the whole output has been read and SystemExit is raised if git has failed """
+    git_log_format = '%x1f'.join(placeholder for _, placeholder in GIT_LOG_FIELDS)
+    command = ['git', '-C', str(repo_dir), 'log', '-z', f'--pretty=format:{git_log_format}']
+    if revision_range:
+        command.append(revision_range)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', errors='replace')
+    try:
+        buffer = ''
+        for chunk in iter(lambda: process.stdout.read(65536), ''):
+            *records, buffer = (buffer + chunk).split('\0')
+            for record in records:
+                yield parse_git_log_record(record)
+        if buffer:
+            yield parse_git_log_record(buffer)
+        # git only writes to stderr on errors, so it can be read once stdout is closed
+        error = process.stderr.read()
+        if process.wait() != 0:
+            raise SystemExit(f'git log failed in {repo_dir}: {error.strip()}')
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.stderr.close()
+        process.wait()
+
+
+# conventional commit subject: type(optional scope)!: message, the type is any word and the ! marks a breaking change
+COMMIT_PATTERN = re.compile(r"(?P<type>[A-Za-z]+)(?:\((?P<scope>[^()]*)\))?(?P<breaking>!)?:(?P<message>.+)")
+# issue urls of the footer, ie issue: url or issues: url1, url2 or one issue line per url
+ISSUE_PATTERN = re.compile(r"https?://[^\s,]+/issues/\d+")
+BREAKING_FOOTER_PATTERN = re.compile(r"^BREAKING[ -]CHANGE:", re.MULTILINE)
+TAG_PATTERN = re.compile(r"tag: (?P<version>[^,]*)")
+
+# changelog sections of every version in order of appearance, commit types not listed go to other
+SECTIONS = {'breaking': 'Breaking changes', 'feat': 'New features', 'fix': 'Bug fixes', 'other': 'Other changes'}
+
+Commit = namedtuple('Commit', ['section', 'scope', 'message', 'issues'])
+Tag = namedtuple('Tag', ['refs', 'tag', 'overview', 'sections'])
+
+
+def classify_commit(subject, body):
+    """ returns the Commit record of a conventional commit, or None if the subject doesn't follow the convention """
+    commit_subject = COMMIT_PATTERN.match(subject)
+    if not commit_subject:
+        return None
+    commit_type, scope, breaking, message = commit_subject.groups()
+    # footers are in the last paragraph of the body
+    footer = body[body.rfind('\n\n') + 2:] if '\n\n' in body else body
+    issues = tuple(ISSUE_PATTERN.findall(footer)) if footer.startswith('issue') else ()
+    if breaking or ('BREAKING' in body and BREAKING_FOOTER_PATTERN.search(body)):
+        section = 'breaking'
+    elif commit_type.lower() in ('feat', 'fix'):
+        section = commit_type.lower()
+    else:
+        section = 'other'
+    return Commit(section, scope.strip() if scope else '', message.strip(), issues)
 
 
 def get_tag_list(git_log, min_version):
     tag_list = []
-    commit_pattern = re.compile(r"^((?P<type>build|ci|docs|feat|fix|perf|refactor|style|test)\((?P<scope>\w+)\):)(?P<message>.+)")
-    issue_pattern = re.compile(r"issue: (?P<issue_url>http.+/issues/)(?P<issue_number>\d+)")
-    tag_pattern = re.compile(r"tag: (?P<version>.*),*")
+    sections = None
     for commit in git_log:
-        # Tag Version
-        commit_ref = commit.get('refs')
-        if commit_ref:
-            tag_dict = {'refs': tag_pattern.match(commit_ref).groupdict().get("version", '').replace("v", "").strip()}
+        # Tag Version, branch refs are ignored
+        refs = commit.get('refs')
+        commit_tag = TAG_PATTERN.search(refs) if refs else None
+        if commit_tag:
+            version = commit_tag.group('version').strip()
             # Start Changelog in version 3
             try:
-                version_num = int(tag_dict['refs'].replace(".", ""))
+                version_num = int(version.replace("v", "").replace(".", ""))
             except ValueError:
                 return tag_list
 
             if version_num < min_version:
                 return tag_list
-            tag_dict['overview'] = commit.get('body').strip()
-            tag_dict['feat'] = []
-            tag_dict['fix'] = []
-            tag_dict['other'] = []
-            tag_list.append(tag_dict)
+            sections = {section: [] for section in SECTIONS}
+            tag_list.append(Tag(version.replace("v", ""), version, commit.get('body').strip(), sections))
             continue
 
         # Commit
-        if tag_list:
-            commit_dict = {}
-            commit_subject = commit_pattern.match(commit.get("subject", ""))
-            if commit_subject:
-                commit_dict = {k: v.strip() for k, v in commit_subject.groupdict().items()}
-
-            commit_issue = issue_pattern.match(commit.get('body').split('\n\n')[-1])
-            if commit_issue:
-                commit_dict.update({k: v.strip() for k, v in commit_issue.groupdict().items()})
-
-            commit_type = commit_dict.get('type')
-            if commit_type:
-                if commit_type.strip() in ['fix', 'feat']:
-                    tag_dict[commit_type.strip()].append(commit_dict)
-                else:
-                    tag_dict['other'].append(commit_dict)
+        if sections is not None:
+            commit_record = classify_commit(commit.get('subject', ''), commit.get('body', ''))
+            if commit_record:
+                sections[commit_record.section].append(commit_record)
 
     return tag_list
 
 
 def get_md_str_changelog(tag_list, repo_title, github_url):
-    md_str = ""
+    return f"# {repo_title} changelog \n\n" + get_md_str_versions(tag_list, github_url)
 
-    md_str += f"# {repo_title} changelog \n"
-    md_str += f"\n"
 
+def get_md_str_versions(tag_list, github_url):
+    md_lines = []
+    append = md_lines.append
     for tag in tag_list:
-        md_str += f"## What's new in version [{tag['refs']}]({github_url}/releases/tag/{tag['refs']})"
-        md_str += f"{tag['overview']}"
-        md_str += f"\n"
-
-        if tag.get('feat'):
-            md_str += f"### New features\n"
-            for feature in tag['feat']:
-                if feature.get('message'):
-                    md_str += f"* {feature['message']}"
-                    if feature.get('scope'):
-                        md_str += f"({feature['scope']})"
-                    if feature.get('issue_url') and feature.get('issue_number'):
-                        md_str += f"[#{feature['issue_number']}]({feature['issue_url']}{feature['issue_number']})"
-                    md_str += f"\n"
-        if tag.get('fix'):
-            md_str += f"### Bug fixes\n"
-            for feature in tag['fix']:
-                if feature.get('message'):
-                    md_str += f"* {feature['message']}"
-                    if feature.get('scope'):
-                        md_str += f"({feature['scope']})"
-                    if feature.get('issue_url') and feature.get('issue_number'):
-                        md_str += f"[#{feature['issue_number']}]({feature['issue_url']}{feature['issue_number']})"
-                    md_str += f"\n"
-        if tag.get('other'):
-            md_str += f"### Other changes\n"
-            for feature in tag['other']:
-                if feature.get('message'):
-                    md_str += f"* {feature['message']}"
-                    if feature.get('scope'):
-                        md_str += f"({feature['scope']})"
-                    if feature.get('issue_url') and feature.get('issue_number'):
-                        md_str += f"[#{feature['issue_number']}]({feature['issue_url']}{feature['issue_number']})"
-                    md_str += f"\n"
-    return md_str
+        append(f"## What's new in version [{tag.refs}]({github_url}/releases/tag/{tag.refs}){tag.overview}\n")
+        for section, title in SECTIONS.items():
+            commits = tag.sections[section]
+            if commits:
+                append(f"### {title}\n")
+                for _, scope, message, issues in commits:
+                    if message:
+                        append(f"* {message}({scope})" if scope else f"* {message}")
+                        for issue in issues:
+                            append(f"[#{issue[issue.rfind('/') + 1:]}]({issue})")
+                        append("\n")
+    return ''.join(md_lines)
+
+
+def get_state_path(output):
+    """ returns the path of the file where the last processed tag of a changelog is saved """
+    return Path(output).parent.joinpath('.' + Path(output).stem + '_state.json')
+
+
+def load_last_tag(output):
+    """ returns the last tag processed in the previous execution, or None if the changelog must be rebuilt """
+    try:
+        with open(get_state_path(output)) as state_file:
+            last_tag = json.load(state_file).get('last_tag')
+    except (OSError, ValueError):
+        return None
+    if not Path(output).exists():
+        return None
+    return last_tag
+
+
+def save_last_tag(output, tag):
+    with open(get_state_path(output), 'w') as state_file:
+        json.dump({'last_tag': tag}, state_file, indent=2)
+
+
+def tag_exists(repo_dir, tag):
+    """ check if a tag exists in the repository, git exits with 1 if the tag is not found and with other codes on errors """
+    process = subprocess.run(['git', '-C', str(repo_dir), 'rev-parse', '-q', '--verify', f'refs/tags/{tag}'],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding='utf-8', errors='replace')
+    if process.returncode not in (0, 1):
+        raise SystemExit(f'git rev-parse failed in {repo_dir}: {process.stderr.strip()}')
+    return process.returncode == 0
+
+
+def insert_md_str_versions(changelog, md_str_versions):
+    """ inserts the sections of the new versions before the first version section of an existing changelog """
+    position = changelog.find("## What's new in version")
+    if position < 0:
+        return changelog + md_str_versions
+    return changelog[:position] + md_str_versions + changelog[position:]
+
+
+def generate_changelog(repo_path, repo_title, github_url, output, min_version, full=False):
+    """ creates or updates the changelog file of a repository, returns the list of new versions """
+    # only the commits after the last processed tag are read, unless the changelog must be rebuilt
+    last_tag = None if full else load_last_tag(output)
+    if last_tag and not tag_exists(repo_path, last_tag):
+        print(f'Last processed tag {last_tag} not found, rebuilding changelog file')
+        last_tag = None
+    revision_range = f'{last_tag}..HEAD' if last_tag else None
+
+    # the git log process is stopped as soon as the minimum version is reached
+    with stage('git log and classification'), contextlib.closing(get_git_log(repo_path, revision_range)) as git_log:
+        tag_list = get_tag_list(git_log, min_version)
+
+    if last_tag:
+        if not tag_list:
+            print(f'No new versions since {last_tag}')
+            return tag_list
+        with stage('rendering'):
+            md_str = insert_md_str_versions(Path(output).read_text(), get_md_str_versions(tag_list, github_url))
+    else:
+        with stage('rendering'):
+            md_str = get_md_str_changelog(tag_list, repo_title, github_url)
+
+    if md_str:
+        with stage('file writing'), open(output, 'w') as changelog_fh:
+            changelog_fh.write(md_str)
+        count(1, len(md_str.encode('utf-8')))
+        if tag_list:
+            save_last_tag(output, tag_list[0].tag)
+    else:
+        print('Error generating changelog file')
+    return tag_list
+
+
+def find_tag(tag_list, version):
+    """ returns the Tag record of a version from a list of Tag records, or None if it is not in the list """
+    return next((tag for tag in tag_list if tag.refs == version.replace("v", "")), None)
+
+
+def get_release_tag(repo_path, version, tag_list=()):
+    """ returns the Tag record of a version of a repository. It is taken from tag_list, the versions already read, if it is there,
+    otherwise the history is read only until that version """
+    release_tag = find_tag(tag_list, version)
+    if release_tag:
+        return release_tag
+    version_num = int(version.replace("v", "").replace(".", ""))
+    with stage('git log and classification'), contextlib.closing(get_git_log(repo_path)) as git_log:
+        return find_tag(get_tag_list(git_log, version_num), version)
+
+
+def scan_repository(repo_path, min_version, full, release_version):
+    """ generates the changelog of a repository with the default title, url and output, returns the new versions, the release tag, the error and the elapsed time """
+    start = time.perf_counter()
+    repo_name = Path(repo_path).resolve().name
+    output = str(Path(repo_path).joinpath(repo_name, 'docs', 'source', 'change_log.md'))
+    try:
+        tag_list = generate_changelog(repo_path, repo_name.capitalize(), f"https://github.com/bioexcel/{repo_name}", output, min_version, full)
+        release_tag = get_release_tag(repo_path, release_version, tag_list) if release_version else None
+        return tag_list, release_tag, None, time.perf_counter() - start
+    except (Exception, SystemExit) as exc:
+        return [], None, f"{type(exc).__name__}: {exc}", time.perf_counter() - start
+
+
+def generate_changelogs(repo_paths, min_version, full, release_version=None, summary_output=None, jobs=8):
+    """ generates the changelogs of several repositories scanning them concurrently, and the summary of a release version for all of them """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda repo_path: scan_repository(repo_path, min_version, full, release_version), repo_paths))
+
+    print(f"{'repository':<30}{'new versions':>14}{'time (s)':>10}  status")
+    summary = [f"# BioBB {release_version} release summary\n", "\n"]
+    failed = 0
+    for repo_path, (tag_list, release_tag, error, seconds) in zip(repo_paths, results):
+        repo_name = Path(repo_path).resolve().name
+        print(f"{repo_name:<30}{len(tag_list):>14}{seconds:>10.2f}  {error or 'ok'}")
+        failed += bool(error)
+        if release_tag:
+            summary.append(f"# {repo_name.capitalize()}\n")
+            summary.append(get_md_str_versions([release_tag], f"https://github.com/bioexcel/{repo_name}"))
+
+    if summary_output and release_version:
+        with stage('file writing'), open(summary_output, 'w') as summary_fh:
+            summary_fh.write(''.join(summary))
+        count(1, len(''.join(summary).encode('utf-8')))
+
+    if failed:
+        raise SystemExit(f'{failed} of {len(repo_paths)} repositories failed')
 
 
 def main():
@@ -137,7 +303,7 @@ def main():
     output_file = str(Path.cwd().joinpath(repo_name, 'docs', 'source', 'change_log.md'))
     parser = argparse.ArgumentParser(description="Creates changelog.md",
                                      formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
-                                     epilog="Examples: \nchangelog_generator.py -i path/to/git_repo/ -t RepoTitle -o path/output/file/changelog.md -v 300")
+                                     epilog="Examples: \nchangelog_generator.py -i path/to/git_repo/ -t RepoTitle -o path/output/file/changelog.md -v 300\nchangelog_generator.py -r path/to/git_repo1/ path/to/git_repo2/ -l 3.1.0 -s path/output/file/release_summary.md")
     required_args = parser.add_argument_group('required arguments')
     required_args.add_argument('--repo_path', '-i', required=False, default=repo_dir, type=str,
                                help='git repository folder in path/to/git_repo/')
@@ -148,18 +314,22 @@ def main():
     required_args.add_argument('--output', '-o', required=False, default=output_file, type=str,
                                help='path/to/the/change_log.md')
     required_args.add_argument('--min_version', '-v', required=False, default=300, type=int, help='Minimum version to start the changelog file')
+    parser.add_argument('--full', '-f', required=False, action='store_true', help='Rebuild the whole changelog file instead of adding only the versions released since the last execution')
+    parser.add_argument('--repo_paths', '-r', required=False, nargs='+', default=None,
+                        help='Several git repository folders whose changelogs are generated at the same time. Titles, urls and outputs are the default ones for every repository')
+    parser.add_argument('--release_version', '-l', required=False, default=None, type=str, help='Version whose changes in all the --repo_paths repositories are written to --summary_output')
+    parser.add_argument('--summary_output', '-s', required=False, default=None, type=str, help='path/to/the/release_summary.md')
+    parser.add_argument('--jobs', '-j', required=False, default=8, type=int, help='Number of repositories scanned at the same time. Default: 8')
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
-    git_log = get_git_log(args.repo_path)
-    tag_list = get_tag_list(git_log, args.min_version)
-    md_str = get_md_str_changelog(tag_list, args.repo_title, args.github_url)
-
-    if md_str:
-        with open(args.output, 'w') as changelog_fh:
-            changelog_fh.write(md_str)
-    else:
-        print('Error generating changelog file')
-
+    with profile(args.profile):
+        if args.repo_paths:
+            generate_changelogs(args.repo_paths, args.min_version, args.full, args.release_version, args.summary_output, args.jobs)
+        else:
+            generate_changelog(args.repo_path, args.repo_title, args.github_url, args.output, args.min_version, args.full)
 
 
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,70 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
+import hashlib
+import io
 import json
+import os
 from pathlib import Path
 import re
+import shutil
 import subprocess
+import sys
+from string import Template
+from importlib import metadata
+from concurrent.futures import ThreadPoolExecutor
+from output_writer import OutputWriter
+from instrumentation import stage, add_profile_argument, profile
+from schema_model import Schema
+
+
+DOCUMENT_HEADER = Template("""# $biobb_title Command Line Help
+Generic usage:
+```python
+biobb_command [-h] --config CONFIG --input_file(s) <input_file(s)> --output_file <output_file>
+```
+-----------------
+
+""")
+
+BLOCK_TEMPLATE = Template("""
+## $block_title
+$block_description
+### Get help
+Command:
+```python
+$block_name -h
+```
+$block_help
+### I / O Arguments
+Syntax: input_argument (datatype) : Definition
+
+Config input / output arguments for this building block:
+$io_arguments### Config
+Syntax: input_parameter (datatype) - (default_value) Definition
+
+Config parameters for this building block:
+$config_parameters$config_sections""")
+
+IO_ARGUMENT_TEMPLATE = Template("""* **$argument** (*$type*): $description. File type: $filetype. [Sample file]($sample). Accepted formats: $formats
+""")
+
+CONFIG_PARAMETER_TEMPLATE = Template("""* **$argument** (*$type*): ($default) $description.
+""")
+
+CONFIG_SECTION_TEMPLATE = Template("""### $extension_title
+$config_files#### Command line
+```python
+$block_name $command_line
+```
+""")
+
+CONFIG_FILE_TEMPLATE = Template("""#### [$config_title config file]($config_url)
+```python
+$config_content
+```
+""")
 
 
 def rstlink2mdlink(rst_string):
@@ -24,6 +84,289 @@ def get_file_content(file_path):
     return Path(file_path).read_text()
 
 
+def get_config_index(config_path):
+    """ lists the config folder once, returns a dict of file names to paths """
+    with os.scandir(config_path) as entries:
+        return {entry.name: entry.path for entry in entries if entry.is_file()}
+
+
+def render_block(block_name, schema, block_help, config_index, config_path, config_url):
+    """ returns the markdown section of a block from its Schema """
+    io_arguments = []
+    command_line_list = []
+    for argument in schema.arguments:
+        formats = get_enum_extensions(argument.enum or [])
+        io_arguments.append(IO_ARGUMENT_TEMPLATE.substitute(argument=argument.name, type=argument.type, description=argument.description,
+                                                            filetype=argument.filetype, sample=argument.sample, formats=formats))
+        if argument.sample:
+            sample_file = argument.sample.split('/')[-1]
+        else:
+            sample_file = f"{argument.filetype}.{formats.split(',')[0].lower()}"
+        command_line_list.append(f"--{argument.name} {sample_file}")
+
+    config_parameters = [CONFIG_PARAMETER_TEMPLATE.substitute(argument=prop.name, type=prop.type, default=prop.default,
+                                                              description=rstlink2mdlink(prop.description or ''))
+                         for prop in schema.properties or []]
+
+    config_sections = []
+    for extension in ['yml', 'json']:
+        config_file_name = 'config_'+block_name+'.'+extension
+        config_files = []
+        for config_title, file_name in [('Common', config_file_name),
+                                        ('Docker', 'config_'+block_name+'_docker.'+extension),
+                                        ('Singularity', 'config_'+block_name+'_singularity.'+extension)]:
+            # the common config file is mandatory
+            if file_name in config_index or config_title == 'Common':
+                file_path = config_index.get(file_name, str(Path(config_path).joinpath(file_name)))
+                config_files.append(CONFIG_FILE_TEMPLATE.substitute(config_title=config_title, config_url=config_url+file_name,
+                                                                    config_content=get_file_content(file_path)))
+        config_sections.append(CONFIG_SECTION_TEMPLATE.substitute(extension_title='YAML' if extension == 'yml' else extension.upper(),
+                                                                  config_files=''.join(config_files), block_name=block_name,
+                                                                  command_line=" ".join(['--config', config_file_name] + command_line_list)))
+
+    return BLOCK_TEMPLATE.substitute(block_title=block_name.capitalize(), block_description=rstlink2mdlink(schema.title),
+                                     block_name=block_name, block_help="    " + "\n    ".join(block_help.split('\n')),
+                                     io_arguments=''.join(io_arguments), config_parameters=''.join(config_parameters),
+                                     config_sections=''.join(config_sections))
+
+
+def render_blocks(blocks, help_list, config_path, config_url, config_index=None):
+    """ returns the markdown sections of all blocks in the same order """
+    if config_index is None:
+        config_index = get_config_index(config_path)
+    return [render_block(block_name, schema, block_help, config_index, config_path, config_url)
+            for (block_name, schema), block_help in zip(blocks, help_list)]
+
+
+def get_schema_help(block_name, schema):
+    """ builds a help text similar to the block one from its Schema """
+    parser = argparse.ArgumentParser(prog=block_name, description=schema.title,
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
+    parser.add_argument('--config', required=False, help='This file can be a YAML file, JSON file or JSON string')
+    required_args = parser.add_argument_group('required arguments')
+    for argument in schema.arguments:
+        help_str = f"{argument.description}. Accepted formats: {get_enum_extensions(argument.enum or []).lower()}."
+        if argument.name in schema.required:
+            required_args.add_argument(f'--{argument.name}', required=True, help=help_str)
+        else:
+            parser.add_argument(f'--{argument.name}', required=False, help=help_str)
+    return parser.format_help().rstrip('\n')
+
+
+def get_block_help(block_name, schema, timeout):
+    """ returns the output of block_name -h, or the help built from the JSON schema if the block is not installed, it fails or it is too slow.
+    The second value is False when the help must not be cached """
+    try:
+        with stage('help command'):
+            process = subprocess.run([block_name, '-h'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        print(f"{block_name} -h failed ({type(exc).__name__}), using help from JSON schema")
+        return get_schema_help(block_name, schema), not isinstance(exc, subprocess.TimeoutExpired)
+    # a block that is installed but crashes is not cached, so its help is executed again once it is fixed
+    if process.returncode != 0:
+        print(f"{block_name} -h failed (exit code {process.returncode}), using help from JSON schema")
+        return get_schema_help(block_name, schema), False
+    output = process.stdout
+    if output.endswith('\n'):
+        output = output[:-1]
+    return output, True
+
+
+def get_block_hash(block_name, schema, block_help, config_index, config_url):
+    """ returns a hash of the JSON schema, help text and config files a block section is rendered from """
+    block_hash = hashlib.sha256()
+    for text in [json.dumps(schema.toDict(), sort_keys=True), block_help, config_url]:
+        block_hash.update(text.encode('utf-8') + b'\0')
+    for extension in ['yml', 'json']:
+        for variant in ['', '_docker', '_singularity']:
+            file_name = 'config_'+block_name+variant+'.'+extension
+            if file_name in config_index:
+                block_hash.update(file_name.encode('utf-8') + b'\0' + Path(config_index[file_name]).read_bytes() + b'\0')
+    return block_hash.hexdigest()
+
+
+def load_doc_manifest(manifest_path, output_path):
+    """ returns the block hashes and the text of the previous document, or empty ones if the document or this script have changed since then """
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        document = Path(output_path).read_text()
+    except (OSError, ValueError):
+        return {}, ''
+    if manifest.get('generator') != hashlib.sha256(Path(__file__).read_bytes()).hexdigest() or \
+       manifest.get('document') != hashlib.sha256(document.encode('utf-8')).hexdigest():
+        return {}, ''
+    return manifest.get('blocks', {}), document
+
+
+def get_doc_manifest(document, blocks, block_hashes, sections, header):
+    """ returns the manifest of a document: its hash and the hash and position of every block section """
+    manifest = {
+        'generator': hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
+        'document': hashlib.sha256(document.encode('utf-8')).hexdigest(),
+        'blocks': {}
+    }
+    start = len(header)
+    for (block_name, _), block_hash, section in zip(blocks, block_hashes, sections):
+        manifest['blocks'][block_name] = {'hash': block_hash, 'start': start, 'end': start + len(section)}
+        start += len(section)
+    return manifest
+
+
+def get_entry_points():
+    """ returns the console script entry points of all the installed distributions by name, the metadata of the distributions is read only once """
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        entry_points = entry_points.select(group='console_scripts')
+    else:
+        entry_points = entry_points.get('console_scripts', [])
+    # the first distribution found wins, as in the previous lookup by name
+    console_scripts = {}
+    for entry_point in entry_points:
+        console_scripts.setdefault(entry_point.name, entry_point)
+    return console_scripts
+
+
+def get_in_process_help(block_name, entry_points):
+    """ returns the help of a block calling its entry point function of entry_points in this process with -h, or None if it fails.
+    It changes sys.argv and the standard output, so it must not be called from several threads at the same time """
+    entry_point = entry_points.get(block_name)
+    if not entry_point:
+        return None
+    output = io.StringIO()
+    argv = sys.argv
+    sys.argv = [block_name, '-h']
+    try:
+        with stage('help in process'), contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            entry_point.load()()
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            return None
+    except Exception:
+        return None
+    finally:
+        sys.argv = argv
+    return output.getvalue().rstrip('\n')
+
+
+def get_package_version(biobb_name):
+    try:
+        return metadata.version(biobb_name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_help_fingerprint(block_name, schema, package_version):
+    """ returns a hash of the installed package version, the block entry point script and the JSON schema """
+    script = shutil.which(block_name)
+    script_mtime = Path(script).stat().st_mtime_ns if script else None
+    schema_json = json.dumps(schema.toDict(), sort_keys=True)
+    return hashlib.sha256(f"{package_version}|{script}|{script_mtime}|{schema_json}".encode('utf-8')).hexdigest()
+
+
+def load_help_cache(cache_path):
+    try:
+        with open(cache_path) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_help_cache(cache_path, help_cache):
+    writer = OutputWriter()
+    writer.add(cache_path, json.dumps(help_cache, indent=2, sort_keys=True))
+    writer.commit()
+
+
+def collect_help(blocks, jobs, timeout, help_cache=None, package_version=None, in_process=False):
+    """ runs block_name -h for every (block_name, schema) in blocks concurrently, returns the help texts in the same order.
+    The blocks found in help_cache with the same fingerprint are not executed, and help_cache is updated with the new help texts.
+    With in_process the entry points of the blocks are called in this process, and only the blocks that fail are executed """
+    if help_cache is None:
+        help_cache = {}
+
+    fingerprints = [get_help_fingerprint(block_name, schema, package_version) for block_name, schema in blocks]
+    pending = [(block, fingerprint) for block, fingerprint in zip(blocks, fingerprints)
+               if help_cache.get(block[0], {}).get('fingerprint') != fingerprint]
+
+    fresh_help = {}
+    if in_process:
+        entry_points = get_entry_points() if pending else {}
+        for (block_name, _), fingerprint in pending:
+            block_help = get_in_process_help(block_name, entry_points)
+            if block_help is not None:
+                fresh_help[block_name] = block_help
+                help_cache[block_name] = {'fingerprint': fingerprint, 'help': block_help}
+        print(f"{len(fresh_help)} of {len(pending)} block helps rendered in process")
+        pending = [pending_block for pending_block in pending if pending_block[0][0] not in fresh_help]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(lambda pending_block: get_block_help(pending_block[0][0], pending_block[0][1], timeout), pending)
+        for ((block_name, _), fingerprint), (block_help, cacheable) in zip(pending, results):
+            fresh_help[block_name] = block_help
+            if cacheable:
+                help_cache[block_name] = {'fingerprint': fingerprint, 'help': block_help}
+
+    print(f"{len(blocks) - len(fresh_help)} of {len(blocks)} block helps taken from cache")
+    return [fresh_help[block_name] if block_name in fresh_help else help_cache[block_name]['help'] for block_name, _ in blocks]
+
+
+def load_blocks(json_schemas_folder, biobb_name):
+    """ returns the (block_name, Schema) pairs of the JSON schemas of a package, sorted by name so the document order doesn't depend on the file system """
+    blocks = []
+    for json_file_path in sorted(Path(json_schemas_folder).glob('*.json')):
+        block_name = json_file_path.stem
+        if block_name == biobb_name:
+            continue
+        with stage('JSON schemas load'):
+            blocks.append((block_name, Schema.load(json_file_path)))
+    return blocks
+
+
+def generate_document(blocks, biobb_name, config_path, output, help_cache_path, jobs=8, timeout=60, refresh=False, in_process=False, split=None):
+    """ writes the command line documentation of the (block_name, Schema) blocks, rendering only the sections of the blocks that have changed """
+    biobb_title = f"BioBB {biobb_name.split('_')[1].upper()}"
+    config_url = f"https://github.com/bioexcel/{biobb_name}/blob/master/{biobb_name}/test/data/config/"
+
+    help_cache = {} if refresh else load_help_cache(help_cache_path)
+    with stage('help collection'):
+        help_list = collect_help(blocks, jobs, timeout, help_cache, get_package_version(biobb_name), in_process)
+    save_help_cache(help_cache_path, help_cache)
+
+    # sections of the blocks that haven't changed are taken from the previous document
+    config_index = get_config_index(config_path)
+    manifest_path = str(Path(help_cache_path).with_name('.command_line_doc_manifest.json'))
+    previous_blocks, previous_document = ({}, '') if refresh else load_doc_manifest(manifest_path, output)
+    block_hashes = [get_block_hash(block_name, schema, block_help, config_index, config_url)
+                    for (block_name, schema), block_help in zip(blocks, help_list)]
+    sections = [None] * len(blocks)
+    for i, ((block_name, _), block_hash) in enumerate(zip(blocks, block_hashes)):
+        previous_block = previous_blocks.get(block_name)
+        if previous_block and previous_block['hash'] == block_hash:
+            sections[i] = previous_document[previous_block['start']:previous_block['end']]
+
+    changed = [i for i, section in enumerate(sections) if section is None]
+    with stage('rendering'):
+        rendered = render_blocks([blocks[i] for i in changed], [help_list[i] for i in changed], config_path, config_url, config_index)
+    for i, section in zip(changed, rendered):
+        sections[i] = section
+    print(f"{len(changed)} of {len(blocks)} block sections rendered")
+
+    # the whole document is written at once, and only if it has changed
+    header = DOCUMENT_HEADER.substitute(biobb_title=biobb_title)
+    document = header + ''.join(sections)
+    writer = OutputWriter()
+    writer.add(output, document)
+    writer.add(manifest_path, json.dumps(get_doc_manifest(document, blocks, block_hashes, sections, header), indent=2, sort_keys=True))
+    if split:
+        Path(split).mkdir(parents=True, exist_ok=True)
+        for (block_name, _), section in zip(blocks, sections):
+            writer.add(Path(split).joinpath(block_name + '.md'), section)
+    files = len(writer.files) - 1
+    written, _ = writer.commit()
+    print(f"{len([path for path in written if path != manifest_path])} of {files} markdown files written")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Creates config_biobb.json and config_biobb.yml files.",
                                      formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
@@ -37,91 +380,24 @@ def main():
     required_args.add_argument('--biobb_name', '-b', required=True,
                                help='biobb_name')
     required_args.add_argument('--output', '-o', required=True, help='Output md file')
+    parser.add_argument('--jobs', '-n', required=False, default=8, type=int, help='Number of block help commands executed at the same time. Default: 8')
+    parser.add_argument('--timeout', '-t', required=False, default=60, type=float, help='Seconds to wait for a block help command before using the help built from the JSON schema. Default: 60')
+    parser.add_argument('--help_cache', required=False, default=None,
+                        help='JSON file where the block help texts are cached. Default: .command_line_help_cache.json in the parent folder of the json_schemas folder')
+    parser.add_argument('--refresh', '-r', required=False, action='store_true', help='Run the help command and render the section of every block ignoring the cached help texts and the previous document')
+    parser.add_argument('--in_process', '-p', required=False, action='store_true',
+                        help='Get the help of every block calling its console script entry point in this process instead of running a new process per block')
+    parser.add_argument('--split', '-s', required=False, default=None,
+                        help='Folder where a markdown file per block is written besides the whole document')
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
-    biobb_name = args.biobb_name
-    biobb_title = f"BioBB {biobb_name.split('_')[1].upper()}"
-    config_url = f"https://github.com/bioexcel/{biobb_name}/blob/master/{biobb_name}/test/data/config/"
-    config_path = args.config_folder
-
-    with open(args.output, 'w') as out:
-        # Write document title
-        out.write(f"# {biobb_title} Command Line Help\n")
-        out.write(f"Generic usage:\n")
-        out.write(f"```python\n")
-        out.write(f"biobb_command [-h] --config CONFIG --input_file(s) <input_file(s)> --output_file <output_file>\n")
-        out.write(f"```\n")
-        out.write(f"-----------------\n")
-        out.write(f"\n")
-
-        for json_file_path in Path(args.json_schemas_folder).glob('*.json'):
-            block_name = json_file_path.stem
-            if block_name == biobb_name:
-                continue
-            with open(json_file_path) as json_file:
-                json_dict = json.load(json_file)
-            block_description = rstlink2mdlink(json_dict['title'])
-            block_help = "    " + "\n    ".join(subprocess.getoutput(f'{block_name} -h').split('\n'))
-
-            out.write(f"\n")
-            out.write(f"## {block_name.capitalize()}\n")
-            out.write(f"{block_description}\n")
-            out.write(f"### Get help\n")
-            out.write(f"Command:\n")
-            out.write(f"```python\n")
-            out.write(f"{block_name} -h\n")
-            out.write(f"```\n")
-            out.write(f"{block_help}\n")
-
-            out.write(f"### I / O Arguments\n")
-            out.write(f"Syntax: input_argument (datatype) : Definition\n")
-            out.write(f"\n")
-            out.write(f"Config input / output arguments for this building block:\n")
-            command_line_list = []
-            for argument, argument_dict in json_dict['properties'].items():
-                if argument != 'properties':
-                    out.write(f"* **{argument}** (*{argument_dict['type']}*): {argument_dict['description']}. File type: {argument_dict['filetype']}. [Sample file]({argument_dict['sample']}). Accepted formats: {get_enum_extensions(argument_dict['enum'])}\n")
-                    if argument_dict['sample']:
-                        sample_file = argument_dict['sample'].split('/')[-1]
-                    else:
-                        sample_file = f"{argument_dict['filetype']}.{get_enum_extensions(argument_dict['enum']).split(',')[0].lower()}"
-                    command_line_list.append(f"--{argument} {sample_file}")
-            out.write(f"### Config\n")
-            out.write(f"Syntax: input_parameter (datatype) - (default_value) Definition\n")
-            out.write(f"\n")
-            out.write(f"Config parameters for this building block:\n")
-            for argument, argument_dict in json_dict['properties']['properties']['properties'].items():
-                out.write(f"* **{argument}** (*{argument_dict['type']}*): ({argument_dict['default']}) {rstlink2mdlink(argument_dict['description'])}.\n")
-
-            for extension in ['yml', 'json']:
-                if extension == 'yml':
-                    out.write(f"### YAML\n")
-                else:
-                    out.write(f"### {extension.upper()}\n")
-                config_file_name = 'config_'+block_name+'.'+extension
-                command_line_str = " ".join(['--config', config_file_name] + command_line_list)
-                out.write(f"#### [Common config file]({config_url+config_file_name})\n")
-                out.write(f"```python\n")
-                out.write(f"{get_file_content(str(Path(config_path).joinpath(config_file_name)))}\n")
-                out.write(f"```\n")
-                docker_file_name = 'config_'+block_name+'_docker.'+extension
-                if Path(config_path).joinpath(docker_file_name).exists():
-                    out.write(f"#### [Docker config file]({config_url+docker_file_name})\n")
-                    out.write(f"```python\n")
-                    out.write(f"{get_file_content(str(Path(config_path).joinpath(docker_file_name)))}\n")
-                    out.write(f"```\n")
-                singularity_file_name = 'config_' + block_name + '_singularity.'+extension
-                if Path(config_path).joinpath(singularity_file_name).exists():
-                    out.write(f"#### [Singularity config file]({config_url+singularity_file_name})\n")
-                    out.write(f"```python\n")
-                    out.write(f"{get_file_content(str(Path(config_path).joinpath(singularity_file_name)))}\n")
-                    out.write(f"```\n")
-                out.write(f"#### Command line\n")
-                out.write(f"```python\n")
-                out.write(f"{block_name} {command_line_str}\n")
-                out.write(f"```\n")
-
+    with profile(args.profile):
+        blocks = load_blocks(args.json_schemas_folder, args.biobb_name)
+        help_cache_path = args.help_cache or str(Path(args.json_schemas_folder).parent.joinpath('.command_line_help_cache.json'))
+        generate_document(blocks, args.biobb_name, args.config_folder, args.output, help_cache_path,
+                          args.jobs, args.timeout, args.refresh, args.in_process, args.split)
 
 if __name__ == '__main__':
     main()
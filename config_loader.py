@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+from pathlib import Path
+import yaml
+
+# libyaml loader is much faster than the pure python one, but it is only available if PyYAML was built with libyaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+loaded_configs = {}
+
+
+def load_config(config_path, loader=SafeLoader):
+    """ loads a YAML file parsing it only once per run while it doesn't change on disk. The returned object is shared by all the callers so it must not be modified """
+    path = Path(config_path).resolve()
+    stat = path.stat()
+    key = (str(path), loader)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if key not in loaded_configs or loaded_configs[key][0] != signature:
+        with open(path) as config_file:
+            loaded_configs[key] = (signature, yaml.load(config_file, Loader=loader))
+    return loaded_configs[key][1]
+
+
+def get_config_entries(config):
+    """ returns the name / entry pairs of a loaded config, adding the container variants declared in the containers section of every module,
+    ie a make_ndx entry with a containers section with docker and singularity keys adds the make_ndx_docker and make_ndx_singularity entries.
+    The properties of a variant are the ones of the module updated with the global containers section of the variant and the ones of the
+    variant. The entries already defined in the config are never replaced. The entries are shared with the config so they must not be modified """
+    global_containers = config.get('containers') or {}
+    entries = []
+    for name, entry in config.items():
+        entries.append((name, entry))
+        if not isinstance(entry, dict) or not entry.get('containers'):
+            continue
+        for variant, variant_properties in entry['containers'].items():
+            if name + '_' + variant in config:
+                continue
+            variant_entry = {key: value for key, value in entry.items() if key != 'containers'}
+            variant_entry['properties'] = {**(entry.get('properties') or {}), **(global_containers.get(variant) or {}), **(variant_properties or {})}
+            entries.append((name + '_' + variant, variant_entry))
+    return entries
@@ -3,33 +3,162 @@
 import argparse
 import yaml
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from config_loader import load_config, get_config_entries
+from output_writer import OutputWriter
+from instrumentation import stage, count, add_profile_argument, profile
+
+# libyaml dumper is much faster than the pure python one, but it is only available if PyYAML was built with libyaml
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+extensions = ['yml', 'json']
+# file of the config folder with the container variants derived in the previous execution, so their config files can be removed when they are no longer derived.
+# It only exists while some variants are derived
+state_file_name = '.configs_generator_state.json'
+
+
+def get_module_configs(config):
+    """ returns the module / properties pairs of the modules with properties and their container variants, without their paths """
+    module_configs = []
+    for module, module_properties in get_config_entries(config):
+        if isinstance(module_properties, dict) and module_properties.get('properties'):
+            # the loaded config is shared, so paths and containers are removed from a copy
+            module_configs.append((module, {key: value for key, value in module_properties.items() if key not in ['paths', 'containers']}))
+    return module_configs
+
+
+def get_derived_modules(config, module_configs):
+    """ returns the names of the modules of module_configs that are container variants derived from a containers section, not written in the config """
+    return {module for module, _ in module_configs if module not in config}
+
+
+def load_derived_modules(output):
+    """ returns the container variants derived in the previous execution """
+    try:
+        with open(Path(output).joinpath(state_file_name)) as state_file:
+            return set(json.load(state_file).get('derived', []))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_derived_modules(writer, output, derived):
+    """ adds the state file with the derived container variants to a writer, or removes it if there are no derived variants """
+    state_path = Path(output).joinpath(state_file_name)
+    if derived:
+        writer.add(state_path, json.dumps({'derived': sorted(derived)}, indent=4))
+    else:
+        writer.remove(state_path)
+
+
+def render_config(module_properties):
+    """ returns the content of the yml and json config files of a module """
+    return {
+        'yml': yaml.dump(module_properties, Dumper=SafeDumper),
+        'json': json.dumps(module_properties, indent=4)
+    }
+
+
+def render_configs(module_configs, jobs=1):
+    """ returns the content of the config files of all the modules, in the same order as module_configs """
+    properties = [module_properties for _, module_properties in module_configs]
+    if jobs <= 1:
+        with stage('rendering'):
+            return [render_config(module_properties) for module_properties in properties]
+
+    with stage('rendering pool'), ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(render_config, properties, chunksize=max(1, len(properties) // (jobs * 4))))
+
+
+def get_config_path(output, module, extension):
+    return Path(output).joinpath('config_' + module + '.' + extension)
+
+
+def is_config_file(path, derived=()):
+    """ check if a file is a config file created by this script. The docker and singularity variants are maintained by hand, unless they are in derived,
+    the variants derived from a containers section """
+    if not path.name.startswith('config_') or path.suffix not in ['.yml', '.json']:
+        return False
+    return not path.stem.endswith(('_docker', '_singularity')) or path.stem[len('config_'):] in derived
+
+
+def get_json_generator_paths(module_configs, output):
+    """ returns the config files json_generator writes for the <module>_docker entries, as config_<module>.json, ie for biobb_pmx """
+    return {get_config_path(output, module[:-len('_docker')], 'json') for module, _ in module_configs if module.endswith('_docker')}
+
+
+def update_configs(module_configs, rendered, output, derived=()):
+    """ writes the config files whose content has changed and removes the config files of the modules that no longer exist,
+    including the container variants derived in the previous execution, but not the config files written by json_generator.
+    derived are the container variants of module_configs """
+    writer = OutputWriter()
+    previous_derived = load_derived_modules(output)
+    # the files written by json_generator are not orphans
+    json_generator_paths = get_json_generator_paths(module_configs, output)
+    for path in Path(output).iterdir():
+        if is_config_file(path, previous_derived) and path not in json_generator_paths:
+            writer.remove(path)
+    for (module, _), contents in zip(module_configs, rendered):
+        for extension in extensions:
+            writer.add(get_config_path(output, module, extension), contents[extension])
+
+    saved = len(writer.files)
+    save_derived_modules(writer, output, derived)
+    written, removed = writer.commit()
+    written = [path for path in written if Path(path).name != state_file_name]
+    removed = [path for path in removed if Path(path).name != state_file_name]
+    for path in written:
+        print(f'Writting: {path}')
+    for path in removed:
+        print(f'Removing: {path}')
+    print(f'{len(written)} files saved, {saved - len(written)} files unchanged, {len(removed)} files removed')
 
 
 def main():
     parser = argparse.ArgumentParser(description="Creates config_biobb.json and config_biobb.yml files.",
                                      formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
-                                     epilog="Examples: \nconfigs_generator.py -i path/to/testconffile/conf.yml -o path/to/outputdir")
+                                     epilog="Examples: \nconfigs_generator.py -i path/to/testconffile/conf.yml -o path/to/outputdir\nconfigs_generator.py -i path/to/testconffile/conf.yml -o path/to/outputdir --update --jobs 4")
     required_args = parser.add_argument_group('required arguments')
     required_args.add_argument('--input_conf_yaml', '-i', required=True, help='conf.yml file from tests configuration')
     required_args.add_argument('--output', '-o', required=True, help='Output path to the biobb_package/biobb_package/test/data/config folder.')
+    parser.add_argument('--update', '-u', required=False, action='store_true', help='Rewrite the existing config files whose content has changed and remove the config files of the modules that are not in the conf.yml file')
+    parser.add_argument('--jobs', '-j', required=False, default=1, type=int, help='Number of processes used to render the config files. Default: 1.')
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
-    config = yaml.safe_load(open(args.input_conf_yaml))
-    print(config)
-    for module, module_properties in config.items():
-        if isinstance(module_properties, dict) and module_properties.get('properties'):
-            del module_properties['paths']
-            for extension in ['yml', 'json']:
-                file_out_path = Path(args.output).joinpath('config_'+module+'.'+extension)
+    with profile(args.profile):
+        with stage('conf.yml load'):
+            config = load_config(args.input_conf_yaml)
+        module_configs = get_module_configs(config)
+        derived = get_derived_modules(config, module_configs)
+        if not args.update:
+            # only the config files that don't exist are written
+            module_configs = [(module, module_properties) for module, module_properties in module_configs
+                              if not all(get_config_path(args.output, module, extension).exists() for extension in extensions)]
+
+        rendered = render_configs(module_configs, args.jobs)
+
+        if args.update:
+            update_configs(module_configs, rendered, args.output, derived)
+            return
+
+        # the variants derived in previous executions are kept until the next update
+        writer = OutputWriter()
+        save_derived_modules(writer, args.output, load_derived_modules(args.output) | derived)
+        writer.commit()
+
+        for (module, _), contents in zip(module_configs, rendered):
+            for extension in extensions:
+                file_out_path = get_config_path(args.output, module, extension)
                 if not file_out_path.exists():
                     print(f'Writting: {file_out_path}')
-                    with open(file_out_path, 'w') as file_out:
-                        if extension == 'yml':
-                            yaml.safe_dump(module_properties, file_out)
-                        else:
-                            json.dump(module_properties, file_out, indent=2)
+                    with stage('file writing'), open(file_out_path, 'w') as file_out:
+                        file_out.write(contents[extension])
+                    count(1, len(contents[extension].encode('utf-8')))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import os
+import time
+from pathlib import Path
+
+# inotify is only used if the inotify_simple package is installed, otherwise the files are polled
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+def get_snapshot(paths):
+    """ returns the modification time and size of every existing file """
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class FileWatcher():
+    """ waits for changes in the files returned by get_paths, that is called again after every change so new files are also watched.
+    With inotify the folders of the files are watched, otherwise the files are polled every interval seconds """
+
+    def __init__(self, get_paths, interval=1.0, debounce=0.5):
+        self.get_paths = get_paths
+        self.interval = interval
+        self.debounce = debounce
+        self.snapshot = get_snapshot(get_paths())
+        self.inotify = INotify() if INotify is not None else None
+        self.folders = set()
+        self.addWatches()
+
+    def addWatches(self):
+        if self.inotify is None:
+            return
+        mask = flags.MODIFY | flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM
+        for folder in {str(Path(path).parent) for path in self.snapshot} - self.folders:
+            self.inotify.add_watch(folder, mask)
+            self.folders.add(folder)
+
+    def getChanges(self):
+        """ returns the paths created, modified or removed since the last call """
+        snapshot = get_snapshot(self.get_paths())
+        changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+    def wait(self):
+        """ blocks until some files change and then no more changes happen for debounce seconds, returns the changed paths """
+        changed = set()
+        while not changed:
+            if self.inotify is not None:
+                self.inotify.read()
+            else:
+                time.sleep(self.interval)
+            changed = self.getChanges()
+
+        # editors and version control tools usually write several files in a row
+        while True:
+            time.sleep(self.debounce)
+            if self.inotify is not None:
+                self.inotify.read(timeout=0)
+            more = self.getChanges()
+            if not more:
+                break
+            changed |= more
+
+        self.addWatches()
+        return changed
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class Instrumentation():
+    """ times the named stages of an execution and counts the files and bytes written. The stages executed in pools of processes are timed as a whole by the parent process """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.events = []
+        self.files = 0
+        self.bytes = 0
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """ times a stage, the same stage can be executed several times and in several threads """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                calls, seconds = self.stages.get(name, (0, 0.0))
+                self.stages[name] = (calls + 1, seconds + end - start)
+                self.events.append({'name': name, 'ph': 'X', 'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+                                    'pid': os.getpid(), 'tid': threading.get_ident()})
+
+    def count(self, files, size):
+        """ adds files and bytes written """
+        with self.lock:
+            self.files += files
+            self.bytes += size
+
+    def printSummary(self):
+        print()
+        print('{:<30}{:>8}{:>12}'.format('stage', 'calls', 'time (s)'))
+        for name, (calls, seconds) in self.stages.items():
+            print('{:<30}{:>8}{:>12.3f}'.format(name, calls, seconds))
+        print('{} files and {} bytes written in {:.3f} seconds'.format(self.files, self.bytes, time.perf_counter() - self.origin))
+
+    def saveTrace(self, path):
+        """ saves the stages in the Chrome trace event format, it can be opened with chrome://tracing or https://ui.perfetto.dev """
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, trace_file)
+
+
+instrumentation = Instrumentation()
+stage = instrumentation.stage
+count = instrumentation.count
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', required=False, default=None, type=str,
+                        help='Path prefix of the profiling files, path/to/prefix.trace.json with the stages in Chrome trace format and path/to/prefix.prof with the cProfile stats.')
+
+
+@contextlib.contextmanager
+def profile(prefix=None):
+    """ prints the summary of the stages at the end of the execution and, if prefix is given, saves the trace of the stages and the cProfile stats """
+    profiler = cProfile.Profile() if prefix else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield instrumentation
+    finally:
+        if profiler:
+            profiler.disable()
+            Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(prefix) + '.prof')
+            instrumentation.saveTrace(str(prefix) + '.trace.json')
+        instrumentation.printSummary()
+        if prefix:
+            print('Profiling files saved: ' + str(prefix) + '.trace.json, ' + str(prefix) + '.prof')
@@ -2,23 +2,84 @@ import glob
 import argparse
 import re
 import json
+import ast
+import hashlib
+import time
+import sys
 import yaml
-from importlib import import_module
+from collections import namedtuple
+from functools import lru_cache
+from importlib import import_module, reload
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
 from ast import literal_eval
 from pathlib import Path, PurePath
 from os import walk
-
-regex_default = '\((\"*([a-zA-Z0-9_ \-\^\:\.\/\']*|\-*\d*\.*\d*)\"*)\)'
-regex_default_array = '\((\[.*?\])\)'
-regex_float = '\-*\d*\.\d*'
-regex_prop_name = '\*\*(.*?)\*\*'
-regex_type = '\(\*(.*?)\*\)'
+from config_loader import load_config, get_config_entries
+from output_writer import OutputWriter
+from instrumentation import stage, add_profile_argument, profile
+from schema_model import Schema, FileArgument, Property
+from file_watcher import FileWatcher
+from command_line_doc_generator import generate_document
+from configs_generator import get_module_configs, get_derived_modules, render_configs, update_configs
+from package_index import index_formats, get_index_path, get_index_entry, render_index
+import schema_model
+import package_index
+
+regex_default = re.compile(r'\((\"*([a-zA-Z0-9_ \-\^\:\.\/\']*|\-*\d*\.*\d*)\"*)\)')
+regex_default_array = re.compile(r'\((\[.*?\])\)')
+regex_float = re.compile(r'\-*\d*\.\d*')
+regex_prop_name = re.compile(r'\*\*(.*?)\*\*')
+regex_type = re.compile(r'\(\*(.*?)\*\)')
+regex_filetype = re.compile(r'(?<=File type:\s)(\w+)')
+regex_sample = re.compile(r'<(.*)>')
+regex_description = re.compile(r'^(.*?)(?=\.)')
+
+# source files of the modules that affect the content of the output files, the incremental cache is discarded if any of them changes
+generator_sources = [__file__, schema_model.__file__, package_index.__file__]
+
+json_types = { 'str': 'string', 'int': 'number', 'float': 'float', 'bool': 'boolean', 'dic': 'object' }
+
+# one row of the Args section of the docs
+# level 1: I/O arguments and properties dictionary, level 2: properties, level 3: parameters
+DocRow = namedtuple('DocRow', ['level', 'name', 'type', 'default', 'description', 'values', 'optional', 'filetype', 'sample'])
+
+@lru_cache(maxsize=None)
+def similar_class(names, module):
+    """ return the class name most similar to the module name, names must be a sorted tuple """
+    sel_class = ''
+    similarity = 0
+    for item in names:
+        if ( item[0].isupper() and 
+        not item.startswith('Path') and 
+        not item.startswith('Pure') and
+        not item.startswith('check_') ):
+            s = SequenceMatcher(None, item, module).ratio()
+            if s > similarity:
+                sel_class = item
+                similarity = s
+
+    return sel_class
 
 class JSONSchemaGenerator():
 
-    def __init__(self, input_package, output_path, **kwargs):
+    def __init__(self, input_package, output_path, static=False, jobs=1, incremental=False, class_map=None, index_format='json', **kwargs):
         self.input_package = input_package
+        self.static = static
+        self.jobs = jobs
+        self.incremental = incremental
+
+        if index_format not in index_formats:
+            raise SystemExit('Unknown index format ' + str(index_format) + ', it must be one of: ' + ', '.join(index_formats))
+        self.index_format = index_format
+
+        # map of module names to class names for the modules that can't be resolved automatically
+        self.class_map = {}
+        if class_map:
+            if not Path(class_map).exists():
+                raise SystemExit('Unexisting class map file')
+            with open(class_map) as file:
+                self.class_map = json.load(file)
 
         # check if output_path exists
         if not Path(output_path).exists():
@@ -28,27 +89,109 @@ class JSONSchemaGenerator():
         if not input_package in output_path:
             raise SystemExit('Incorrect output path. The structure must be: path/biobb_package/biobb_package')
 
+        self.package_path = PurePath(output_path)
         self.output_path = PurePath(output_path).joinpath('json_schemas')
         self.output_path_test = PurePath(output_path).joinpath('test')
         self.output_path_config = PurePath(output_path).joinpath('test/data/config')
+        self.cache_path = PurePath(output_path).joinpath('.json_generator_cache.json')
+        self.writer = OutputWriter()
+        self.schemas = {}
 
         if not Path(self.output_path).exists():
             raise SystemExit('Incorrect output path. The structure must be: path/biobb_package/biobb_package')
        
 
-    def similar_string(self, a, b):
-        """ check similarity between two strings """
-        return SequenceMatcher(None, a, b).ratio()
+    def getClassName(self, classes, module):
+        """ get class name of a module from a list of (class name, defined in module) tuples """
+
+        # override map
+        if module in self.class_map:
+            return self.class_map[module]
+
+        # exact match of the module name in CamelCase with a class defined in the module
+        local = sorted(name for name, is_local in classes if is_local)
+        camel = module.replace('_', '').lower()
+        for name in local:
+            if name.lower() == camel:
+                return name
+
+        # classes defined in the module
+        if len(local) == 1:
+            return local[0]
+        if local:
+            return similar_class(tuple(local), module)
+
+        # similarity with all the module names
+        return similar_class(tuple(sorted(name for name, _ in classes)), module)
+
+    def getStaticAll(self, path):
+        """ return the __all__ list of a python file without importing it """
+        tree = ast.parse(Path(path).read_text())
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == '__all__' for t in node.targets):
+                return literal_eval(node.value)
+
+        raise SystemExit('No __all__ list found in ' + str(path))
+
+    def getStaticDoc(self, package, module):
+        """ return the class name and documentation of a module parsing its source code with ast """
+        path = self.package_path.joinpath(package, module + '.py')
+        with stage('source parsing'):
+            tree = ast.parse(Path(path).read_text())
+        classes = { node.name: node for node in tree.body if isinstance(node, ast.ClassDef) }
+
+        with stage('class lookup'):
+            sel_class = self.getClassName([(name, True) for name in classes], module)
+        if not sel_class in classes:
+            raise SystemExit('No class found for module ' + module + ' in ' + str(path))
+
+        return sel_class, ast.get_docstring(classes[sel_class], clean=False)
+
+    def getImportDoc(self, package, module):
+        """ return the class name and documentation of a module importing it """
+        # import single module
+        with stage('import'):
+            mod = import_module(self.input_package + '.' + package + '.' + module)
+
+        classes = [(name, getattr(obj, '__module__', None) == mod.__name__) for name, obj in vars(mod).items() if isinstance(obj, type)]
+        with stage('class lookup'):
+            sel_class = self.getClassName(classes, module)
+        if not sel_class:
+            raise SystemExit('No class found for module ' + module)
+
+        # get class documentation
+        klass = getattr(mod, sel_class)
+        return sel_class, klass.__doc__
+
+    def getModuleSchema(self, package, module, doc_hash=None):
+        """ get the JSON schema and class name of a single module, returning the error instead of raising it. If the hash of the documentation is doc_hash, the documentation is not parsed """
+        try:
+            if self.static: class_name, doc = self.getStaticDoc(package, module)
+            else: class_name, doc = self.getImportDoc(package, module)
+
+            new_hash = self.getHash(doc)
+            if new_hash == doc_hash:
+                return None, new_hash, None, class_name
+
+            doclines = doc.splitlines()
+
+            with stage('parseDocs'):
+                return self.parseDocs(doclines, module), new_hash, None, class_name
+        except (Exception, SystemExit) as exc:
+            return None, None, type(exc).__name__ + ': ' + str(exc), None
+
+    def getModuleSchemas(self, tasks):
+        """ get the JSON schemas of all modules, in the same order as tasks """
+        if self.jobs <= 1:
+            return [self.getModuleSchema(package, module, doc_hash) for package, module, doc_hash in tasks]
+
+        with stage('modules pool'), ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self.getModuleSchema, package, module, doc_hash) for package, module, doc_hash in tasks]
+            return [future.result() for future in futures]
 
     def getType(self, type):
         """ return JSON friendly type """
-        if type == 'str': return 'string'
-        if type == 'int': return 'number'
-        if type == 'float': return 'float'
-        if type == 'bool': return 'boolean'
-        if type == 'dic': return 'object'
-
-        return type 
+        return json_types.get(type, type)
 
     def getDefault(self, default, i):
         """ return defaults """ 
@@ -61,7 +204,7 @@ class JSONSchemaGenerator():
         if val == 'None': return None
         if val.lstrip('-+').isdigit(): 
             return int(val)
-        if re.match(regex_float, val) is not None:
+        if regex_float.match(val) is not None:
             return float(val)
 
         if isinstance(val, str): return val.strip('\"')
@@ -69,171 +212,138 @@ class JSONSchemaGenerator():
         return val
 
 
-    def parseDocs(self, doclines, module):
-        """ parse python docs to object / JSON format """
+    def tokenizeDocs(self, doclines):
+        """ parse the Args section of python docs in a single pass, returning a DocRow for each argument, property and parameter """
 
-        # get title
-        title = doclines[0]
-        # parse documentation
         args = False
-        required = []
-        object_schema = {
-            "$schema": "http://json-schema.org/draft-07/schema#",
-            "$id": "http://bioexcel.eu/" + self.input_package + "/json_schemas/1.0/" + module,
-            "title": title,
-            "type": "object",
-            "required": [],
-            "properties": {}
-        }
-        properties = {}
         for row in doclines:
-            leading = len(row) - len(row.lstrip())
             # check if arguments
-            if 'Args:' in row:
-                args = True
-
-            if args:
-                # first level: I/O & properties dictionary
-                if leading == 8: 
-                    # get required array
-                    chunks1 = row.split(' (')
-                    prop_id = chunks1[0].strip()
-                    if('properties' not in chunks1[0] and '(Optional)' not in row): required.append(prop_id)
-
-                    # get I/O properties
-                    if 'properties' not in chunks1[0]:
-
-                        chunks2 = chunks1[1].split(')')
-                        if '(Optional)' not in row: chunks3 = row.split('):')
-                        else: chunks3 = row.split(') (Optional):')
-
-                        #chunks3[1] contains description, file type and accepted formats
-
-                        if 'File type:' in chunks3[1]: filetype = re.search('(?<=File type:\s)(\w+)', chunks3[1]).group(1)
-                        else: filetype = None
-
-                        if 'Sample file' in chunks3[1]: sample = re.search('<(.*)>', chunks3[1]).group(1)
-                        else: sample = None
-
-                        chunks4 = chunks3[1].split('Accepted formats:')
-
-                        # check if property has "Accepted formats:"
-                        if len(chunks4) > 1: 
-
-                            values = chunks4[1].replace('.','').split(',')
-                            values = [item.strip() for item in values]
-                            values = ['.*\.{0}$'.format(item) for item in values]
-
-                            p = {
-                                "type": self.getType(chunks2[0].strip()),
-                                #"description": chunks4[0].strip(),
-                                "description": re.search('^(.*?)(?=\.)', chunks3[1]).group(1).strip(),
-                                "filetype": filetype,
-                                "sample": sample,
-                                "enum": values
-                                }
-
-                        else:
-
-                            p = {
-                                "type": self.getType(chunks2[0].strip()),
-                                #"description": chunks3[1].strip(),
-                                "description": re.search('^(.*?)(?=\.)', chunks3[1]).group(1).strip(),
-                                "filetype": filetype,
-                                "sample": sample
-                                }
-
-                        properties[prop_id] = p
-
-                # second level: properties
-                if leading == 12 and not row.isspace():
-
-                    if not "properties" in properties: 
-                        properties["properties"] = { "type": "object", "properties": {} }
-
-                    prop_level1 = re.findall(regex_prop_name, row)[0]
-
-                    chunks5 = row.split('Values:')
-
-                    
-
-                    if '["' and '"]' in row: 
-                        regex_def = regex_default_array
-                        index_def = 0
-                    else: 
-                        regex_def = regex_default
-                        index_def = 1
-
-                    if len(chunks5) > 1: 
-
-                        values = chunks5[1].replace('.','').split(',')
-                        values = [item.strip() for item in values]
-
-                        p = {
-                            "type": self.getType(re.findall(regex_type, row)[0]),
-                            "default": self.getDefault(re.findall(regex_def, row)[0], index_def),
-                            "description": chunks5[0].strip().split(') ')[-1],
-                            "enum": values
-                            }
-
-                    else:
+            if not args:
+                args = 'Args:' in row
+                continue
 
-                        p = {
-                            "type": self.getType(re.findall(regex_type, row)[0]),
-                            "default": self.getDefault(re.findall(regex_def, row)[0], index_def),
-                            "description": chunks5[0].strip().split(') ')[-1],
-                            }
+            stripped = row.lstrip()
+            if not stripped:
+                continue
+            leading = len(row) - len(stripped)
 
-                    properties["properties"]["properties"][prop_level1] = p
+            # first level: I/O & properties dictionary
+            if leading == 8:
+                name, _, rest = row.partition(' (')
+                name = name.strip()
+                optional = '(Optional)' in row
 
-                # third level: parameters
-                if(leading == 16):
+                # properties dictionary
+                if 'properties' in name:
+                    yield DocRow(1, name, 'dic', None, None, None, optional, None, None)
+                    continue
 
-                    if not "parameters" in properties["properties"]["properties"][prop_level1]: 
-                        properties["properties"]["properties"][prop_level1] = { "type": "object", "parameters": {} }
+                arg_type = rest.split(' (', 1)[0].split(')', 1)[0].strip()
 
-                    prop_level2 = re.findall(regex_prop_name, row)[0]
+                # text after the type contains description, file type, sample file and accepted formats
+                if optional: text = row.split(') (Optional):', 2)[1]
+                else: text = row.split('):', 2)[1]
 
-                    chunks6 = row.split('Values:')
+                filetype = regex_filetype.search(text).group(1) if 'File type:' in text else None
+                sample = regex_sample.search(text).group(1) if 'Sample file' in text else None
 
-                    if '["' and '"]' in row: 
-                        regex_def = regex_default_array
-                        index_def = 0
-                    else: 
-                        regex_def = regex_default
-                        index_def = 1
+                formats = text.split('Accepted formats:', 2)
+                values = [item.strip() for item in formats[1].replace('.','').split(',')] if len(formats) > 1 else None
 
-                    if len(chunks6) > 1: 
+                yield DocRow(1, name, arg_type, None, regex_description.search(text).group(1).strip(), values, optional, filetype, sample)
 
-                        values = chunks6[1].replace('.','').split(',')
-                        values = [item.strip() for item in values]
+            # second level: properties, third level: parameters
+            elif leading == 12 or leading == 16:
+                text, *values = row.split('Values:', 2)
+                if values: values = [item.strip() for item in values[0].replace('.','').split(',')]
+                else: values = None
 
-                        p = {
-                            "type": self.getType(re.findall(regex_type, row)[0]),
-                            "default": self.getDefault(re.findall(regex_def, row)[0], index_def),
-                            "description": chunks6[0].strip().split(') ')[-1],
-                            "enum": values
-                            }
+                if '"]' in row: default = self.getDefault(regex_default_array.search(row).group(1), 0)
+                else: default = self.getDefault(regex_default.search(row).groups(''), 1)
 
-                    else:
-                        
-                        p = {
-                            "type": self.getType(re.findall(regex_type, row)[0]),
-                            "default": self.getDefault(re.findall(regex_def, row)[0], index_def),
-                            "description": chunks6[0].strip().split(') ')[-1],
-                            }
+                yield DocRow(2 if leading == 12 else 3,
+                             regex_prop_name.search(row).group(1),
+                             regex_type.search(row).group(1),
+                             default,
+                             text.strip().rpartition(') ')[2],
+                             values, False, None, None)
 
-                    properties["properties"]["properties"][prop_level1]["parameters"][prop_level2] = p
-
-        object_schema["required"] = required
-        object_schema["properties"] = properties
+    def parseDocs(self, doclines, module):
+        """ parse python docs to a Schema """
 
-        object_schema["additionalProperties"] = False
+        # get title
+        title = doclines[0]
+        # parse documentation
+        schema = Schema("http://bioexcel.eu/" + self.input_package + "/json_schemas/1.0/" + module, title)
+        for row in self.tokenizeDocs(doclines):
+            # first level: I/O properties, the properties dictionary is filled by the next levels
+            if row.level == 1:
+                if 'properties' in row.name:
+                    continue
+
+                # get required array
+                if not row.optional: schema.required.append(row.name)
+
+                enum = ['.*\\.{0}$'.format(item) for item in row.values] if row.values is not None else None
+                schema.addArgument(FileArgument(row.name, self.getType(row.type), row.description, row.filetype, row.sample, enum))
+
+            # second level: properties
+            elif row.level == 2:
+                prop_level1 = self.getProperty(row)
+                schema.addProperty(prop_level1)
+
+            # third level: parameters
+            else:
+                prop_level1.addParameter(self.getProperty(row))
+
+        return schema
+
+    def getProperty(self, row):
+        """ return the Property of a property or parameter DocRow """
+        return Property(row.name, self.getType(row.type), row.default, row.description, row.values)
+
+    def getHash(self, text):
+        """ return the sha256 hash of a string """
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def getGeneratorHash(self):
+        """ return the hash of the source code of the modules that generate the output files """
+        return self.getHash(''.join(Path(path).read_text() for path in generator_sources))
+
+    def loadCache(self):
+        """ load the cache of the previous execution, it is discarded if this script has changed since then """
+        if not self.incremental or not Path(self.cache_path).exists():
+            return {}
+
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except ValueError:
+            return {}
+
+        if cache.get('generator') != self.getGeneratorHash():
+            return {}
+
+        return cache.get('modules', {})
+
+    def saveCache(self, modules):
+        """ save the hashes and output files of every module """
+        cache = {
+            'generator': self.getGeneratorHash(),
+            'modules': modules
+        }
+        self.writer.add(self.cache_path, json.dumps(cache, indent=4, sort_keys=True))
 
-        return object_schema
+    def removeOrphans(self, cache, new_cache):
+        """ remove the output files of the previous execution that are not generated anymore """
+        outputs = set(f for entry in new_cache.values() for f in entry['outputs'])
+        for entry in cache.values():
+            for f in entry['outputs']:
+                if not f in outputs:
+                    self.writer.remove(self.package_path.joinpath(f))
 
     def cleanOutputPath(self):
-        """ removes all JSON files from the output path (except the biobb_package.json file) and all the config files """
+        """ removes all JSON files from the output path (except the biobb_package.json file) and all the config files, unless they are saved again before the end of the execution """
 
         # get all files in json_schemas folder
         files = []
@@ -247,7 +357,7 @@ class JSONSchemaGenerator():
         # remove files from array of files
         for f in files:
             path = PurePath(self.output_path).joinpath(f)
-            Path(path).unlink()
+            self.writer.remove(path)
 
         # get all files in config folder
         files = []
@@ -255,119 +365,323 @@ class JSONSchemaGenerator():
             files.extend(filenames)
             break
 
-        # remove files from array of files
+        # remove files from array of files, except the hidden ones as the state file of configs_generator
         for f in files:
+            if f.startswith('.'): continue
             path = PurePath(self.output_path_config).joinpath(f)
-            Path(path).unlink()
+            self.writer.remove(path)
 
-    def saveJSONFile(self, module, object_schema):
-        """ save JSON file for each module """
+    def getSchemaPath(self, module):
+        """ return the path of the JSON file for a module """
+        return PurePath(self.output_path).joinpath(module + '.json')
 
-        path = PurePath(self.output_path).joinpath(module + '.json')
-
-        with open(path, 'w') as file:
-            json.dump(object_schema, file, indent=4)
-
-        print(str(path) + " file saved")
-
-    def saveConfigJSONFile(self, properties, module, ):
-        """ save config JSON file for each module """
+    def getConfigPath(self, module):
+        """ return the path of the config JSON file for a module """
 
         # pmx hardcoding
         if module.endswith('_docker'):
             module = module.replace('_docker', '')
 
-        conf_json = {
-            'properties': properties
-        }
-        path = PurePath(self.output_path_config).joinpath('config_'+ module + '.json')
-        with open(path, 'w') as file:
-            json.dump(conf_json, file, indent=4)
-
-        print(str(path) + " file saved")
-
-    def launch(self):
-        """ launch function for JSONSchemaGenerator """
-
-        # import package
-        packages = import_module(self.input_package)
+        return PurePath(self.output_path_config).joinpath('config_'+ module + '.json')
 
-        # remove old JSON files
-        self.cleanOutputPath()
-
-        # get config properties
-        with open(PurePath(self.output_path_test).joinpath('conf.yml')) as f:
-            try:
-                conf = yaml.safe_load(f)
-            except yaml.YAMLError as exc:
-                print(exc)                
-
-        # get documentation of python files
-        for package in packages.__all__:
-            # for every package import all modules
-            modules = import_module(self.input_package + '.' + package)
-            for module in modules.__all__:
+    def saveJSONFile(self, module, schema):
+        """ save JSON file for each module """
 
-                # config files
-                # biobb_analysis hardcoding for bfactor, rms and rmsf
-                mdl = module
-                if(self.input_package == 'biobb_analysis' and not module in conf):
-                    mdl = module + '_first'
+        path = self.getSchemaPath(module)
+        self.writer.add(path, json.dumps(schema.toDict(), indent=4))
 
-                # biobb_analysis hardcoding forcing to take docker cofiguration
-                if(self.input_package == 'biobb_pmx'):
-                    mdl = module + '_docker'
+    def saveConfigJSONFile(self, properties, module, ):
+        """ save config JSON file for each module """
 
-                if('properties' in conf[mdl] and conf[mdl]['properties'] is not None): 
+        conf_json = {
+            'properties': properties
+        }
+        path = self.getConfigPath(module)
+        self.writer.add(path, json.dumps(conf_json, indent=4))
+
+    def saveIndex(self, index):
+        """ save the package index with the entries of all modules, the index of the other format is removed """
+        for index_format in index_formats:
+            self.writer.remove(get_index_path(self.package_path, self.input_package, index_format))
+        path = get_index_path(self.package_path, self.input_package, self.index_format)
+        self.writer.add(path, render_index(self.input_package, index, self.index_format))
+
+    def writeFiles(self):
+        """ write all the saved files at once, only the ones that have changed are written """
+        saved = len(self.writer.files)
+        written, removed = self.writer.commit()
+        for path in written:
+            print(str(path) + " file saved")
+        for path in removed:
+            print(str(path) + " file removed")
+        print(str(len(written)) + " files saved, " + str(saved - len(written)) + " files unchanged, " + str(len(removed)) + " files removed")
+
+        return { 'saved': len(written), 'unchanged': saved - len(written), 'removed': len(removed) }
+
+    def launch(self, changed=None):
+        """ launch function for JSONSchemaGenerator, returns a summary of the execution.
+        If changed is a set of module names, the documentation of the other modules found in the cache is not read again """
+
+        # files are kept in memory until all modules are processed
+        self.writer = OutputWriter()
+        # Schema of every module parsed in this execution, so other emitters can use them without reading the JSON files
+        self.schemas = {}
+
+        # get packages list, importing the package or parsing its source code
+        with stage('import' if not self.static else 'source parsing'):
+            if self.static: packages = self.getStaticAll(self.package_path.joinpath('__init__.py'))
+            else: packages = import_module(self.input_package).__all__
+
+        # load cache of the previous execution, if there is no cache remove old JSON files
+        cache = self.loadCache()
+        if not cache:
+            self.cleanOutputPath()
+
+        # get config properties, with the container variants derived from the containers sections as in configs_generator
+        try:
+            with stage('conf.yml load'):
+                conf = dict(get_config_entries(load_config(PurePath(self.output_path_test).joinpath('conf.yml'))))
+        except yaml.YAMLError as exc:
+            print(exc)                
+
+        # get list of modules for every package
+        tasks = []
+        for package in packages:
+            with stage('import' if not self.static else 'source parsing'):
+                if self.static: modules = self.getStaticAll(self.package_path.joinpath(package, '__init__.py'))
+                else: modules = import_module(self.input_package + '.' + package).__all__
+            for module in modules:
+                # documentation is not parsed again if its hash has not changed and the JSON file exists
+                doc_hash = cache.get(module, {}).get('doc')
+                if not Path(self.getSchemaPath(module)).exists(): doc_hash = None
+                tasks.append((package, module, doc_hash))
+
+        # get documentation of python files, in watch mode only the ones that have changed
+        skipped = [changed is not None and module not in changed and doc_hash is not None for _, module, doc_hash in tasks]
+        results = iter(self.getModuleSchemas([task for task, skip in zip(tasks, skipped) if not skip]))
+        results = [(None, task[2], None, cache[task[1]].get('class')) if skip else next(results) for task, skip in zip(tasks, skipped)]
+
+        # save files following the modules order so the output is deterministic
+        errors = {}
+        new_cache = {}
+        index = []
+        unchanged = 0
+        for (package, module, _), (schema, doc_hash, error, class_name) in zip(tasks, results):
+
+            # config files
+            # biobb_analysis hardcoding for bfactor, rms and rmsf
+            mdl = module
+            if(self.input_package == 'biobb_analysis' and not module in conf):
+                mdl = module + '_first'
+
+            # biobb_analysis hardcoding forcing to take docker cofiguration
+            if(self.input_package == 'biobb_pmx'):
+                mdl = module + '_docker'
+
+            if not mdl in conf:
+                errors[module] = 'KeyError: ' + mdl + ' not found in conf.yml'
+                continue
+
+            entry = cache.get(module, {})
+            conf_hash = None
+            config_path = None
+            outputs = []
+            if('properties' in conf[mdl] and conf[mdl]['properties'] is not None): 
+                conf_hash = self.getHash(json.dumps(conf[mdl]['properties'], sort_keys=True))
+                config_path = self.getConfigPath(mdl)
+                if conf_hash != entry.get('conf') or not Path(config_path).exists():
                     self.saveConfigJSONFile(conf[mdl]['properties'], mdl)
-
-                # json schemas
-                # import single module
-                mod = import_module(self.input_package + '.' + package + '.' + module)
-
-                # get class name through similarity with module name
-                sel_class = ''
-                similarity = 0;
-                for item in dir(mod):
-                    if ( item[0].isupper() and 
-                    not item.startswith('Path') and 
-                    not item.startswith('Pure') and
-                    not item.startswith('check_') ):
-                        s = self.similar_string(item, module)
-                        if s > similarity:
-                            sel_class = item
-                            similarity = s
-
-                # exceptions:
-                if sel_class == "KMeans" and module == "k_means": 
-                    sel_class = "KMeansClustering"
-                if sel_class == "KMeans" and module == "dbscan": 
-                    sel_class = "DBSCANClustering"
-                if sel_class == "AgglomerativeClustering": 
-                    sel_class = "AgglClustering"
-                if sel_class == "SpectralClustering": 
-                    sel_class = "SpecClustering"
-
-                # get class documentation
-                klass = getattr(mod, sel_class)
-                doclines = klass.__doc__.splitlines()
-
-                object_schema = self.parseDocs(doclines, module)
-
-                self.saveJSONFile(module, object_schema)
-
+                outputs.append(str(config_path.relative_to(self.package_path)))
+
+            # json schemas
+            if error:
+                errors[module] = error
+                continue
+
+            schema_path = self.getSchemaPath(module)
+            if schema is not None:
+                self.saveJSONFile(module, schema)
+                self.schemas[module] = schema
+            elif conf_hash == entry.get('conf'): unchanged += 1
+            outputs.append(str(schema_path.relative_to(self.package_path)))
+
+            # the modules that have not changed are added to the package index from their JSON schema
+            with stage('package index'):
+                if schema is None: schema = Schema.load(schema_path)
+                index.append(get_index_entry(module, package, class_name, schema, outputs[-1],
+                                             str(config_path.relative_to(self.package_path)) if config_path else None))
+
+            new_cache[module] = {
+                'doc': doc_hash,
+                'conf': conf_hash,
+                'class': class_name,
+                'outputs': outputs
+            }
+
+        # report all the errors together, leaving the files of the previous execution untouched
+        if errors:
+            for module, error in errors.items():
+                print('Error in module ' + module + ': ' + error)
+            raise SystemExit(str(len(errors)) + ' of ' + str(len(tasks)) + ' modules failed, no files have been written')
+
+        with stage('package index'):
+            self.saveIndex(index)
+
+        if self.incremental:
+            self.removeOrphans(cache, new_cache)
+            self.saveCache(new_cache)
+            print(str(unchanged) + " of " + str(len(tasks)) + " modules unchanged")
+
+        summary = self.writeFiles()
+        summary['modules'] = len(tasks)
+
+        return summary
+
+    def getChangedModules(self, paths):
+        """ return the names of the modules of the changed files, or None if the lists of modules may have changed. In import mode the changed modules are imported again """
+        modules = set()
+        for path in map(Path, paths):
+            if path.suffix != '.py':
+                continue
+            if path.name == '__init__.py':
+                modules = None
+            elif modules is not None:
+                modules.add(path.stem)
+
+            if not self.static:
+                parts = [part for part in path.relative_to(self.package_path).with_suffix('').parts if part != '__init__']
+                name = '.'.join([self.input_package] + parts)
+                if name in sys.modules:
+                    reload(sys.modules[name])
+
+        return modules
+
+    def writeDocs(self, doc_output, schemas):
+        """ write the command line documentation of the package from the schemas parsed in this process, the other schemas are read from their JSON files """
+        blocks = []
+        for path in sorted(Path(self.output_path).glob('*.json')):
+            if path.stem == self.input_package:
+                continue
+            if path.stem not in schemas:
+                schemas[path.stem] = Schema.load(path)
+            blocks.append((path.stem, schemas[path.stem]))
+        generate_document(blocks, self.input_package, self.output_path_config, doc_output, str(self.package_path.joinpath('.command_line_help_cache.json')))
+
+    def watch(self, doc_output=None, interval=1.0, debounce=0.5):
+        """ launch again every time the source code of the modules or the conf.yml file change, only for the modules that have changed, until it is interrupted """
+        self.incremental = True
+        conf_path = Path(self.output_path_test).joinpath('conf.yml')
+        watcher = FileWatcher(lambda: [self.package_path.joinpath('__init__.py'), conf_path] + sorted(Path(self.package_path).glob('*/*.py')), interval, debounce)
+
+        schemas = {}
+        # the modules changed since the last successful execution, None to read all of them
+        changed = None
+        conf_changed = True
+        try:
+            while True:
+                try:
+                    self.launch(changed)
+                    schemas.update(self.schemas)
+                    changed = set()
+                    # the YAML config files shown in the documentation are written by configs_generator
+                    if conf_changed and doc_output:
+                        config = load_config(conf_path)
+                        module_configs = get_module_configs(config)
+                        update_configs(module_configs, render_configs(module_configs), self.output_path_config, get_derived_modules(config, module_configs))
+                    conf_changed = False
+                    if doc_output: self.writeDocs(doc_output, schemas)
+                except (Exception, SystemExit) as exc:
+                    print(type(exc).__name__ + ': ' + str(exc))
+
+                print('Watching ' + str(self.package_path) + ' for changes, press Ctrl+C to stop')
+                paths = watcher.wait()
+                conf_changed = conf_changed or str(conf_path) in paths
+                new_changed = self.getChangedModules(paths)
+                changed = None if changed is None or new_changed is None else changed | new_changed
+                print()
+        except KeyboardInterrupt:
+            print('Watch mode stopped')
+
+
+def launch_package(entry, options):
+    """ launch JSONSchemaGenerator for a manifest entry, returns the summary, the error and the elapsed time """
+    start = time.perf_counter()
+    kwargs = dict(options)
+    kwargs.update({ key: value for key, value in entry.items() if key not in ['package', 'output'] })
+    try:
+        summary = JSONSchemaGenerator(input_package=entry['package'], output_path=entry['output'], **kwargs).launch()
+        return summary, None, time.perf_counter() - start
+    except (Exception, SystemExit) as exc:
+        return None, type(exc).__name__ + ': ' + str(exc), time.perf_counter() - start
+
+def launch_manifest(manifest, options, package_jobs=1):
+    """ launch JSONSchemaGenerator for every package of a manifest in the same process, or in a pool of processes if package_jobs > 1 """
+    entries = load_config(manifest)
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) and 'package' in entry and 'output' in entry for entry in entries):
+        raise SystemExit('Incorrect manifest. It must be a list of package / output pairs')
+
+    # relative output paths are relative to the manifest folder
+    entries = [dict(entry, output=str(Path(manifest).parent.joinpath(entry['output']))) for entry in entries]
+
+    start = time.perf_counter()
+    if package_jobs <= 1:
+        results = [launch_package(entry, options) for entry in entries]
+    else:
+        with ProcessPoolExecutor(max_workers=package_jobs) as executor:
+            futures = [executor.submit(launch_package, entry, options) for entry in entries]
+            results = [future.result() for future in futures]
+
+    # aggregated summary
+    print()
+    print('{:<30}{:>10}{:>10}{:>12}{:>10}{:>12}  {}'.format('package', 'modules', 'saved', 'unchanged', 'removed', 'time (s)', 'status'))
+    failed = 0
+    for entry, (summary, error, seconds) in zip(entries, results):
+        if error:
+            failed += 1
+            print('{:<30}{:>10}{:>10}{:>12}{:>10}{:>12.2f}  {}'.format(entry['package'], '-', '-', '-', '-', seconds, error))
+        else:
+            print('{:<30}{:>10}{:>10}{:>12}{:>10}{:>12.2f}  {}'.format(entry['package'], summary['modules'], summary['saved'], summary['unchanged'], summary['removed'], seconds, 'ok'))
+    print(str(len(entries) - failed) + ' of ' + str(len(entries)) + ' packages generated in {:.2f} seconds'.format(time.perf_counter() - start))
+
+    if failed:
+        raise SystemExit(str(failed) + ' of ' + str(len(entries)) + ' packages failed')
 
 def main():
     parser = argparse.ArgumentParser(description="Creates json_schemas for given BioBB package.", 
                                      formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
-                                     epilog='''Examples: \njson_generator.py -p biobb_package -o path/to/biobb_package/biobb_package\njson_generator.py --package biobb_package --output path/to/biobb_package/biobb_package''')
+                                     epilog='''Examples: \njson_generator.py -p biobb_package -o path/to/biobb_package/biobb_package\njson_generator.py --package biobb_package --output path/to/biobb_package/biobb_package\njson_generator.py --package biobb_package --output path/to/biobb_package/biobb_package --static\njson_generator.py --manifest path/to/manifest.yml --package_jobs 4\njson_generator.py --package biobb_package --output path/to/biobb_package/biobb_package --static --watch --doc_output path/to/biobb_package/biobb_package/docs/source/command_line.md''')
     required_args = parser.add_argument_group('required arguments')
-    required_args.add_argument('--package', '-p', required=True, help='BioBB package to be parsed.')
-    required_args.add_argument('--output', '-o', required=True, help='Output path to the biobb_package/biobb_package folder.')
+    required_args.add_argument('--package', '-p', required=False, help='BioBB package to be parsed. Required if --manifest is not used.')
+    required_args.add_argument('--output', '-o', required=False, help='Output path to the biobb_package/biobb_package folder. Required if --manifest is not used.')
+    parser.add_argument('--manifest', '-m', required=False, help='YAML or JSON file with a list of package / output pairs to be generated in the same process. Every pair can override the static, incremental, class_map and index_format options.')
+    parser.add_argument('--package_jobs', '-k', required=False, default=1, type=int, help='Number of processes used to generate the packages of the manifest. Default: 1.')
+    parser.add_argument('--static', '-s', required=False, action='store_true', help='Read the docs parsing the package source code with ast instead of importing it. The package dependencies are not needed.')
+    parser.add_argument('--jobs', '-j', required=False, default=1, type=int, help='Number of processes used to generate the modules JSON schemas. Default: 1.')
+    parser.add_argument('--incremental', '-n', required=False, action='store_true', help='Only rewrite the files of the modules whose docs or conf.yml properties have changed since the previous execution.')
+    parser.add_argument('--class_map', '-c', required=False, default=str(Path(__file__).parent.joinpath('class_map.json')), help='JSON file mapping module names to class names for the modules whose class can\'t be resolved automatically. Default: class_map.json next to this script.')
+    parser.add_argument('--index_format', '-x', required=False, default='json', choices=index_formats, help='Format of the biobb_package_index file with the class, title, I/O arguments, required arguments and property defaults of every module: json, a single JSON object, or jsonl, a JSON line per module sorted by module name. Default: json.')
+    parser.add_argument('--doc_output', '-d', required=False, default=None, help='Also write the command line documentation of the package in this markdown file, ie path/to/biobb_package/biobb_package/docs/source/command_line.md')
+    parser.add_argument('--watch', '-w', required=False, action='store_true', help='Keep running and generate again the files of the modules whose source code or conf.yml properties change. Implies --incremental.')
+    parser.add_argument('--interval', required=False, default=1.0, type=float, help='Seconds between checks of the source files in watch mode when inotify is not available. Default: 1.')
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
-    JSONSchemaGenerator(input_package=args.package, output_path=args.output).launch()
+    options = { 'static': args.static, 'jobs': args.jobs, 'incremental': args.incremental, 'class_map': args.class_map, 'index_format': args.index_format }
+    if not args.manifest and not (args.package and args.output):
+        parser.error('the following arguments are required: --package/-p and --output/-o, or --manifest/-m')
+    if args.manifest and (args.watch or args.doc_output):
+        parser.error('--watch and --doc_output can\'t be used with --manifest')
+
+    with profile(args.profile):
+        if args.manifest:
+            launch_manifest(args.manifest, options, args.package_jobs)
+        elif args.watch:
+            JSONSchemaGenerator(input_package=args.package, output_path=args.output, **options).watch(args.doc_output, args.interval)
+        else:
+            generator = JSONSchemaGenerator(input_package=args.package, output_path=args.output, **options)
+            generator.launch()
+            if args.doc_output: generator.writeDocs(args.doc_output, generator.schemas)
 
 
 if __name__ == '__main__':
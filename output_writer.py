@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from pathlib import Path
+from instrumentation import stage, count
+
+
+def get_file_mode(path):
+    """ return the permissions of an existing file or the default ones for a new file """
+    try:
+        return Path(path).stat().st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+class OutputWriter():
+    """ keeps the output files in memory and writes them all together at the end of the execution """
+
+    def __init__(self):
+        self.files = {}
+        self.removed = set()
+
+    def add(self, path, content):
+        """ adds a file to be written, content can be str or bytes """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self.files[str(path)] = content
+        self.removed.discard(str(path))
+
+    def remove(self, path):
+        """ adds a file to be removed, unless it is added again before commit """
+        if str(path) not in self.files:
+            self.removed.add(str(path))
+
+    def isChanged(self, path, content):
+        """ check if content is different from the file on disk """
+        try:
+            return Path(path).read_bytes() != content
+        except FileNotFoundError:
+            return True
+
+    def commit(self):
+        """ writes all the changed files through temporary files that are renamed once all of them are written, then removes the old files. Returns the written and the removed paths """
+        with stage('file writing'):
+            changed = [(path, content) for path, content in self.files.items() if self.isChanged(path, content)]
+
+            # write temporary files in the same folder, so the rename is atomic
+            renames = []
+            try:
+                for path, content in changed:
+                    fd, tmp_path = tempfile.mkstemp(prefix='.' + Path(path).name + '.', suffix='.tmp', dir=Path(path).parent)
+                    renames.append((tmp_path, path))
+                    with os.fdopen(fd, 'wb') as tmp_file:
+                        tmp_file.write(content)
+                    os.chmod(tmp_path, get_file_mode(path))
+            except BaseException:
+                for tmp_path, _ in renames:
+                    Path(tmp_path).unlink(missing_ok=True)
+                raise
+
+            for tmp_path, path in renames:
+                os.replace(tmp_path, path)
+
+            removed = [path for path in sorted(self.removed) if Path(path).exists()]
+            for path in removed:
+                Path(path).unlink()
+
+            self.files = {}
+            self.removed = set()
+            count(len(changed), sum(len(content) for _, content in changed))
+
+        return [path for path, _ in changed], removed
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import json
+import mmap
+from pathlib import Path
+
+# formats of the package index: a single JSON object or a JSON line per module, sorted by module name
+index_formats = ['json', 'jsonl']
+
+
+def get_index_path(package_path, package, index_format):
+    """ return the path of the package index, next to the json_schemas folder so it is not read as a module JSON schema """
+    return Path(package_path).joinpath(package + '_index.' + index_format)
+
+
+def get_defaults(properties):
+    """ return the defaults of a list of Property, the properties with parameters return the defaults of their parameters """
+    return { prop.name: get_defaults(prop.parameters) if prop.parameters is not None else prop.default for prop in properties or [] }
+
+
+def get_index_entry(module, package, class_name, schema, schema_path, config_path):
+    """ return the index entry of a module from its Schema, the paths are relative to the package folder """
+    return {
+        "module": module,
+        "package": package,
+        "class": class_name,
+        "title": schema.title,
+        "required": schema.required,
+        "arguments": { argument.name: { "type": argument.type, "filetype": argument.filetype, "enum": argument.enum } for argument in schema.arguments },
+        "properties": get_defaults(schema.properties),
+        "schema": schema_path,
+        "config": config_path
+    }
+
+
+def render_index(package, entries, index_format='json'):
+    """ return the content of the package index. In jsonl format every line is the entry of a module, sorted by module name, so a module can be found with find_index_entry without loading the whole file """
+    entries = sorted(entries, key=lambda entry: entry['module'])
+    if index_format == 'jsonl':
+        return ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+
+    return json.dumps({ "package": package, "modules": { entry['module']: entry for entry in entries } }, separators=(',', ':'))
+
+
+def load_index(path):
+    """ return the entries of a package index by module name """
+    with open(path) as index_file:
+        if Path(path).suffix == '.jsonl':
+            return { entry['module']: entry for entry in map(json.loads, index_file) }
+        return json.load(index_file)['modules']
+
+
+def find_index_entry(path, module):
+    """ return the entry of a module of a jsonl package index, or None if it is not found. The file is memory mapped and only the lines of a binary search are read """
+    with open(path, 'rb') as index_file:
+        if Path(path).stat().st_size == 0:
+            return None
+        with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # lo and hi are always at the start of a line
+            lo, hi = 0, len(data)
+            while lo < hi:
+                start = data.rfind(b'\n', 0, (lo + hi) // 2) + 1
+                end = data.find(b'\n', start)
+                if end == -1: end = len(data)
+                entry = json.loads(data[start:end])
+                if entry['module'] == module:
+                    return entry
+                if entry['module'] < module: lo = end + 1
+                else: hi = start
+
+    return None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import json
+
+SCHEMA_DRAFT = "http://json-schema.org/draft-07/schema#"
+
+
+class FileArgument():
+    """ input / output file argument of a module, enum has the regular expressions of the accepted formats """
+    __slots__ = ('name', 'type', 'description', 'filetype', 'sample', 'enum')
+
+    def __init__(self, name, type, description, filetype=None, sample=None, enum=None):
+        self.name = name
+        self.type = type
+        self.description = description
+        self.filetype = filetype
+        self.sample = sample
+        self.enum = enum
+
+    def toDict(self):
+        p = {
+            "type": self.type,
+            "description": self.description,
+            "filetype": self.filetype,
+            "sample": self.sample
+            }
+        if self.enum is not None: p["enum"] = self.enum
+
+        return p
+
+    @classmethod
+    def fromDict(cls, name, p):
+        return cls(name, p.get('type'), p.get('description'), p.get('filetype'), p.get('sample'), p.get('enum'))
+
+
+class Property():
+    """ property of a module or parameter of a dictionary property. The properties with parameters only keep the object type, as in the JSON schema """
+    __slots__ = ('name', 'type', 'default', 'description', 'enum', 'parameters')
+
+    def __init__(self, name, type, default=None, description=None, enum=None, parameters=None):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.description = description
+        self.enum = enum
+        self.parameters = parameters
+
+    def addParameter(self, parameter):
+        if self.parameters is None:
+            self.type, self.default, self.description, self.enum, self.parameters = 'object', None, None, None, []
+        self.parameters.append(parameter)
+
+    def toDict(self):
+        if self.parameters is not None:
+            return { "type": self.type, "parameters": { parameter.name: parameter.toDict() for parameter in self.parameters } }
+
+        p = {
+            "type": self.type,
+            "default": self.default,
+            "description": self.description
+            }
+        if self.enum is not None: p["enum"] = self.enum
+
+        return p
+
+    @classmethod
+    def fromDict(cls, name, p):
+        parameters = None
+        if 'parameters' in p:
+            parameters = [cls.fromDict(parameter, parameter_dict) for parameter, parameter_dict in p['parameters'].items()]
+        return cls(name, p.get('type'), p.get('default'), p.get('description'), p.get('enum'), parameters)
+
+
+class Schema():
+    """ documentation of a module: file arguments and properties. properties is None when the module has no properties,
+    properties_position is the position of the properties among the file arguments """
+    __slots__ = ('id', 'title', 'required', 'arguments', 'properties', 'properties_position')
+
+    def __init__(self, id, title, required=None, arguments=None, properties=None, properties_position=None):
+        self.id = id
+        self.title = title
+        self.required = required if required is not None else []
+        self.arguments = arguments if arguments is not None else []
+        self.properties = properties
+        self.properties_position = properties_position
+
+    def addArgument(self, argument):
+        self.arguments.append(argument)
+
+    def addProperty(self, prop):
+        if self.properties is None:
+            self.properties = []
+            self.properties_position = len(self.arguments)
+        self.properties.append(prop)
+
+    def toDict(self):
+        """ return the JSON schema """
+        properties = {}
+        for i, argument in enumerate(self.arguments + [None]):
+            if i == self.properties_position:
+                properties["properties"] = { "type": "object", "properties": { prop.name: prop.toDict() for prop in self.properties } }
+            if argument is not None:
+                properties[argument.name] = argument.toDict()
+
+        return {
+            "$schema": SCHEMA_DRAFT,
+            "$id": self.id,
+            "title": self.title,
+            "type": "object",
+            "required": self.required,
+            "properties": properties,
+            "additionalProperties": False
+        }
+
+    @classmethod
+    def fromDict(cls, json_dict):
+        """ return the Schema of a JSON schema """
+        schema = cls(json_dict.get('$id'), json_dict.get('title'), list(json_dict.get('required', [])))
+        for name, p in json_dict.get('properties', {}).items():
+            if name == 'properties':
+                schema.properties_position = len(schema.arguments)
+                schema.properties = [Property.fromDict(prop, prop_dict) for prop, prop_dict in p.get('properties', {}).items()]
+            else:
+                schema.addArgument(FileArgument.fromDict(name, p))
+        return schema
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as json_file:
+            return cls.fromDict(json.load(json_file))
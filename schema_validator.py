@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from os import scandir
+from pathlib import Path
+from config_loader import load_config
+from schema_model import Schema
+
+# python types of the JSON schema types written by json_generator, the properties of other types are not type checked
+schema_types = {
+    'string': (str,),
+    'number': (int, float),
+    'integer': (int,),
+    'float': (int, float),
+    'boolean': (bool,),
+    'object': (dict,),
+    'dict': (dict,),
+    'list': (list,),
+    'array': (list,)
+}
+
+# validator functions of the schemas compiled in this process, by hash of the schema file
+compiled_schemas = {}
+
+
+def get_enum_value(item):
+    """ return the value of an enum item as written by json_generator, ie fast (quick run) -> fast """
+    return item.partition(' (')[0].strip()
+
+
+def compile_properties(properties):
+    """ returns a function that validates a properties dict against a list of Property, returning the list of mismatches """
+    checks = {}
+    for prop in properties:
+        values = frozenset(get_enum_value(item) for item in prop.enum) if prop.enum else None
+        nested = compile_properties(prop.parameters) if prop.parameters else None
+        checks[prop.name] = (prop.type, schema_types.get(prop.type), prop.default is None, values, nested)
+
+    def validate(properties, prefix=''):
+        errors = []
+        for name, value in properties.items():
+            check = checks.get(name)
+            if check is None:
+                errors.append(f"{prefix}{name}: property not found in the JSON schema")
+                continue
+            type_name, types, nullable, values, nested = check
+            if value is None:
+                if not nullable:
+                    errors.append(f"{prefix}{name}: null value but its default is not null")
+                continue
+            # bool is a subclass of int, so booleans are only accepted by boolean properties
+            if types and (not isinstance(value, types) or (isinstance(value, bool) and bool not in types)):
+                errors.append(f"{prefix}{name}: {value!r} is not of type {type_name}")
+                continue
+            # json_generator removes the dots of the enum values
+            if values is not None and str(value).replace('.', '') not in values:
+                errors.append(f"{prefix}{name}: {value!r} is not one of the values {', '.join(sorted(values))}")
+            if nested is not None and isinstance(value, dict):
+                errors.extend(nested(value, prefix + name + '.'))
+        return errors
+
+    return validate
+
+
+def compile_schema(schema_path):
+    """ returns the validator function of the config properties of a JSON schema, every schema is compiled only once per hash """
+    content = Path(schema_path).read_bytes()
+    key = hashlib.sha256(content).hexdigest()
+    if key not in compiled_schemas:
+        compiled_schemas[key] = compile_schema_model(Schema.fromDict(json.loads(content)))
+    return compiled_schemas[key]
+
+
+def compile_schema_model(schema):
+    """ returns the validator function of the config properties of a Schema """
+    return compile_properties(schema.properties or [])
+
+
+def get_schema_name(config_name, schema_names):
+    """ return the JSON schema of a config file, removing the suffixes of the variants as config_<module>_docker """
+    module = config_name[len('config_'):]
+    while module and module not in schema_names:
+        module = module.rpartition('_')[0]
+    return module or None
+
+
+def load_config_file(config_path):
+    if config_path.suffix == '.json':
+        with open(config_path) as config_file:
+            return json.load(config_file)
+    return load_config(config_path)
+
+
+def validate_config(config_path, schema_path):
+    """ validates a config file against a JSON schema, returns the list of mismatches """
+    try:
+        config = load_config_file(Path(config_path))
+        if not isinstance(config, dict) or not isinstance(config.get('properties'), dict):
+            return ['properties: not found in the config file']
+        return compile_schema(schema_path)(config['properties'])
+    except Exception as exc:
+        return [type(exc).__name__ + ': ' + str(exc)]
+
+
+def validate_configs(json_schemas, config_folder, jobs=1):
+    """ validates every config file of a folder against the JSON schema of its module, returns the mismatches of every config file, in order """
+    schema_names = {Path(entry.name).stem for entry in scandir(json_schemas) if entry.name.endswith('.json')}
+    config_paths = sorted(Path(entry.path) for entry in scandir(config_folder)
+                          if entry.name.startswith('config_') and entry.name.endswith(('.json', '.yml', '.yaml')))
+
+    results = {}
+    tasks = []
+    for config_path in config_paths:
+        schema_name = get_schema_name(config_path.stem, schema_names)
+        if schema_name is None:
+            results[config_path] = ['JSON schema not found']
+        else:
+            tasks.append((config_path, Path(json_schemas).joinpath(schema_name + '.json')))
+
+    # the config files of the same module are consecutive, so they are usually validated by the same process
+    if jobs <= 1:
+        errors = [validate_config(config_path, schema_path) for config_path, schema_path in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            errors = executor.map(validate_config, *zip(*tasks), chunksize=max(1, len(tasks) // (jobs * 4))) if tasks else []
+            errors = list(errors)
+    results.update(zip([config_path for config_path, _ in tasks], errors))
+
+    return {config_path: results[config_path] for config_path in config_paths}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validates the config files of a package against its JSON schemas.",
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999),
+                                     epilog="Examples: \nschema_validator.py -j path/to/biobb_package/biobb_package/json_schemas -c path/to/biobb_package/biobb_package/test/data/config\nschema_validator.py -j path/to/biobb_package/biobb_package/json_schemas -c path/to/biobb_package/biobb_package/test/data/config --jobs 4")
+    required_args = parser.add_argument_group('required arguments')
+    required_args.add_argument('--json_schemas', '-j', required=True, type=str, help='Path to the biobb_package/biobb_package/json_schemas folder.')
+    required_args.add_argument('--config_path', '-c', required=True, type=str, help='Path to the biobb_package/biobb_package/test/data/config folder.')
+    parser.add_argument('--jobs', '-n', required=False, default=1, type=int, help='Number of processes used to validate the config files. Default: 1.')
+
+    args = parser.parse_args()
+
+    results = validate_configs(args.json_schemas, args.config_path, args.jobs)
+    failed = 0
+    for config_path, errors in results.items():
+        if errors:
+            failed += 1
+            print(f'{config_path.name}:')
+            for error in errors:
+                print(f'    {error}')
+    print(f'{len(results)} config files validated, {failed} with mismatches')
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()